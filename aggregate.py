@@ -0,0 +1,261 @@
+# aggregate.py
+"""
+Streaming group statistics of CPP/CPPS over a corpus, in constant memory.
+
+Each file is analysed, reduced into its group's running statistics (Welford
+mean/variance, min/max) and quantile sketch, and its result dropped. Aggregates are
+mergeable, so workers can each build one over part of the corpus and the parent
+merges them. Memory depends on the number of groups, not the number of files.
+
+    python aggregate.py <folder> --group-by folder --method CPPS --engine numpy --out summary.csv
+"""
+import argparse
+import math
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from file_utils import save_group_summary
+
+PERCENTILES = (5, 25, 50, 75, 95)
+SKETCH_BIN_WIDTH = 0.01  # dB; quantiles are nearest-rank values to within half a bin
+CHUNK_FILES = 64
+
+
+class RunningStats:
+    """Welford mean/variance with min/max; merge() uses Chan et al.'s parallel update."""
+
+    def __init__(self):
+        self.n = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, x):
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.min = min(self.min, x)
+        self.max = max(self.max, x)
+
+    def merge(self, other):
+        if other.n == 0:
+            return self
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else math.nan
+
+    @property
+    def sd(self):
+        return math.sqrt(self.variance) if self.n > 1 else math.nan
+
+
+class QuantileSketch:
+    """
+    Fixed-width histogram over the value axis: exactly mergeable (counts add up), and
+    its size is bounded by the value range / bin_width, whatever the number of values.
+    """
+
+    def __init__(self, bin_width=SKETCH_BIN_WIDTH):
+        self.bin_width = bin_width
+        self.counts = {}
+        self.n = 0
+
+    def add(self, x):
+        b = math.floor(x / self.bin_width)
+        self.counts[b] = self.counts.get(b, 0) + 1
+        self.n += 1
+
+    def merge(self, other):
+        if other.bin_width != self.bin_width:
+            raise ValueError("Cannot merge sketches with different bin widths.")
+        for b, c in other.counts.items():
+            self.counts[b] = self.counts.get(b, 0) + c
+        self.n += other.n
+        return self
+
+    def quantile(self, q):
+        """
+        Nearest-rank quantile, q in [0, 1]: the centre of the bin holding the
+        ceil(q * n)-th smallest value (the smallest for q = 0), or NaN if empty.
+        """
+        if self.n == 0:
+            return math.nan
+        rank = max(1, math.ceil(q * self.n))
+        seen = 0
+        for b in sorted(self.counts):
+            seen += self.counts[b]
+            if seen >= rank:
+                return (b + 0.5) * self.bin_width
+        return (max(self.counts) + 0.5) * self.bin_width
+
+
+def group_by_folder(path):
+    """Group by the name of the folder holding the file (e.g. session or diagnosis)."""
+    return os.path.basename(os.path.dirname(os.path.abspath(path)))
+
+
+def group_by_speaker(path, sep="_"):
+    """Group by the file name prefix before `sep` (e.g. 'S01_a_1.wav' -> 'S01')."""
+    return os.path.basename(path).split(sep, 1)[0]
+
+
+GROUPINGS = {"folder": group_by_folder, "speaker": group_by_speaker}
+
+
+class GroupedStats:
+    """Per-group RunningStats + QuantileSketch, keyed by group_by(path)."""
+
+    def __init__(self, group_by=group_by_folder, bin_width=SKETCH_BIN_WIDTH):
+        self.group_by = group_by
+        self.bin_width = bin_width
+        self.groups = {}
+        self.errors = {}
+
+    def _group(self, key):
+        if key not in self.groups:
+            self.groups[key] = (RunningStats(), QuantileSketch(self.bin_width))
+        return self.groups[key]
+
+    def add(self, path, value):
+        key = self.group_by(path)
+        if value is None or math.isnan(value):
+            self.errors[key] = self.errors.get(key, 0) + 1
+            return
+        stats, sketch = self._group(key)
+        stats.add(value)
+        sketch.add(value)
+
+    def merge(self, other):
+        for key, (stats, sketch) in other.groups.items():
+            mine_stats, mine_sketch = self._group(key)
+            mine_stats.merge(stats)
+            mine_sketch.merge(sketch)
+        for key, n in other.errors.items():
+            self.errors[key] = self.errors.get(key, 0) + n
+        return self
+
+    def summary(self, percentiles=PERCENTILES):
+        rows = []
+        for key in sorted(set(self.groups) | set(self.errors)):
+            stats, sketch = self.groups.get(key, (RunningStats(), QuantileSketch(self.bin_width)))
+            row = {"group": key, "n": stats.n, "errors": self.errors.get(key, 0),
+                   "mean": stats.mean if stats.n else math.nan, "sd": stats.sd,
+                   "min": stats.min if stats.n else math.nan, "max": stats.max if stats.n else math.nan}
+            for p in percentiles:
+                row[f"p{p}"] = sketch.quantile(p / 100)
+            rows.append(row)
+        return rows
+
+
+def iter_wav_files(folder_path, recursive=True):
+    """Yield .wav paths under folder_path lazily, in sorted order per folder."""
+    for dirpath, dirnames, filenames in os.walk(folder_path):
+        dirnames.sort()
+        for fname in sorted(filenames):
+            if fname.lower().endswith(".wav"):
+                yield os.path.join(dirpath, fname)
+        if not recursive:
+            break
+
+
+def _aggregate_chunk(paths, group_by, bin_width, engine, options):
+    """Analyse `paths` and reduce them into a fresh GroupedStats (runs in workers too)."""
+    agg = GroupedStats(group_by, bin_width)
+    if engine == "numpy":
+        from batch_cepstrum import batch_extract_cpp_packed
+        results, _ = batch_extract_cpp_packed(
+            paths, method=options.get("method", "CPPS"), min_f0=options.get("min_f0", 60),
+            max_f0=options.get("max_f0", 330), analysis_rate=options.get("analysis_rate"))
+        for path, res in zip(paths, results):
+            agg.add(path, res.get("cpp"))
+        return agg
+
+    from cpp_analysis import extract_cpp
+    for path in paths:
+        try:
+            value = extract_cpp(path, region=None, **options)["cpp"]
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+            value = None
+        agg.add(path, value)  # the result dict and its arrays are dropped here
+    return agg
+
+
+def _chunks(iterable, size):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) == size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def aggregate_extract_cpp(folder_path, group_by=group_by_folder, method="CPPS", engine="praat",
+                          workers=1, recursive=True, bin_width=SKETCH_BIN_WIDTH, **options):
+    """
+    Grouped CPP/CPPS statistics for every WAV under folder_path without keeping per-file
+    results. `options` are passed to extract_cpp (file_type, praat_path, min_f0, max_f0,
+    vad_enabled, pause_removal_enabled, analysis_rate). With workers > 1, chunks of files
+    go to a process pool and the partial aggregates are merged; group_by must then be a
+    module-level function. Returns a GroupedStats; call .summary() for the table.
+    """
+    options["method"] = method
+    total = GroupedStats(group_by, bin_width)
+    chunks = _chunks(iter_wav_files(folder_path, recursive), CHUNK_FILES)
+    if workers <= 1:
+        for paths in chunks:
+            total.merge(_aggregate_chunk(paths, group_by, bin_width, engine, options))
+        return total
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = set()
+        for paths in chunks:
+            pending.add(pool.submit(_aggregate_chunk, paths, group_by, bin_width, engine, options))
+            # Keep at most 2 chunks per worker in flight so memory stays bounded
+            if len(pending) >= 2 * workers:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    total.merge(fut.result())
+        for fut in pending:
+            total.merge(fut.result())
+    return total
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Grouped CPP/CPPS statistics over a corpus.")
+    parser.add_argument("folder")
+    parser.add_argument("--group-by", choices=sorted(GROUPINGS), default="folder")
+    parser.add_argument("--method", default="CPPS", choices=["CPP", "CPPS"])
+    parser.add_argument("--engine", default="praat", choices=["praat", "numpy"])
+    parser.add_argument("--praat-path", default="praat.exe")
+    parser.add_argument("--min-f0", type=float, default=60)
+    parser.add_argument("--max-f0", type=float, default=330)
+    parser.add_argument("--analysis-rate", type=float, default=None)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--out", default=None, help="CSV file for the group summary")
+    args = parser.parse_args()
+
+    options = {"min_f0": args.min_f0, "max_f0": args.max_f0, "analysis_rate": args.analysis_rate}
+    if args.engine == "praat":
+        options["praat_path"] = args.praat_path
+    agg = aggregate_extract_cpp(args.folder, GROUPINGS[args.group_by], args.method, args.engine,
+                                args.workers, **options)
+    rows = agg.summary()
+    if args.out:
+        save_group_summary(rows, args.out)
+    for row in rows:
+        print(f"{row['group']}: n={row['n']} mean={row['mean']:.2f} sd={row['sd']:.2f} "
+              f"median={row['p50']:.2f} dB ({row['errors']} errors)")
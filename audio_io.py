@@ -0,0 +1,184 @@
+# audio_io.py
+import struct
+import numpy as np
+import soundfile as sf
+
+# (format tag, bits per sample) -> (numpy dtype, offset, scale) for memory-mappable PCM/float WAV data
+WAV_DTYPES = {
+    (1, 8): ('u1', 128.0, 1.0 / 128),
+    (1, 16): ('<i2', 0.0, 1.0 / 32768),
+    (1, 32): ('<i4', 0.0, 1.0 / 2147483648),
+    (3, 32): ('<f4', 0.0, 1.0),
+    (3, 64): ('<f8', 0.0, 1.0),
+}
+WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def parse_wav_layout(path):
+    """
+    Locate the sample data of an uncompressed WAV file.
+    Returns dict(dtype, offset, frames, channels, sr, sample_offset, scale),
+    or None if the file cannot be memory-mapped (compressed, 24-bit, RF64, not a WAV...).
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = f.read(12)
+            if len(header) < 12 or header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+                return None
+            f.seek(0, 2)
+            file_size = f.tell()
+            pos = 12
+            fmt = None
+            while pos + 8 <= file_size:
+                f.seek(pos)
+                chunk_id, chunk_size = struct.unpack('<4sI', f.read(8))
+                if chunk_id == b'fmt ':
+                    raw = f.read(min(chunk_size, 40))
+                    tag, channels, sr, _, block_align, bits = struct.unpack('<HHIIHH', raw[:16])
+                    if tag == WAVE_FORMAT_EXTENSIBLE and len(raw) >= 26:
+                        # First two bytes of the sub-format GUID hold the actual format tag
+                        tag = struct.unpack('<H', raw[24:26])[0]
+                    fmt = (tag, channels, sr, block_align, bits)
+                elif chunk_id == b'data':
+                    if fmt is None:
+                        return None
+                    tag, channels, sr, block_align, bits = fmt
+                    if (tag, bits) not in WAV_DTYPES or channels < 1 or block_align != channels * bits // 8:
+                        return None
+                    data_offset = pos + 8
+                    # Streaming writers leave 0 / 0xFFFFFFFF here; trust the file length instead
+                    data_size = min(chunk_size, file_size - data_offset) if chunk_size else file_size - data_offset
+                    dtype, sample_offset, scale = WAV_DTYPES[(tag, bits)]
+                    return {
+                        "dtype": np.dtype(dtype),
+                        "offset": data_offset,
+                        "frames": data_size // block_align,
+                        "channels": channels,
+                        "sr": sr,
+                        "sample_offset": sample_offset,
+                        "scale": scale,
+                    }
+                pos += 8 + chunk_size + (chunk_size & 1)
+    except (OSError, struct.error):
+        return None
+    return None
+
+
+class AudioReader:
+    """
+    Lazy, windowed access to an audio file.
+
+    Uncompressed WAV files are memory-mapped at the data chunk offset, so nothing is
+    read until a window is requested; other formats (FLAC, OGG, 24-bit WAV...) are
+    decoded by soundfile only for the requested frames. Samples come back as float32
+    in [-1, 1) by default. Channel selection and downmix are done per window:
+
+        channel=None  -> mono downmix (mean of all channels)
+        channel=k     -> channel k only
+        channel="all" -> array of shape (frames, channels)
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._sf = None
+        self._data = None
+        layout = parse_wav_layout(path)
+        if layout is not None and layout["frames"] > 0:
+            self.sr = layout["sr"]
+            self.channels = layout["channels"]
+            self.frames = layout["frames"]
+            self.native_dtype = layout["dtype"]
+            self._sample_offset = layout["sample_offset"]
+            self._scale = layout["scale"]
+            self._data = np.memmap(path, dtype=self.native_dtype, mode='r', offset=layout["offset"],
+                                   shape=(self.frames, self.channels))
+        else:
+            self._sf = sf.SoundFile(path)
+            self.sr = self._sf.samplerate
+            self.channels = self._sf.channels
+            self.frames = self._sf.frames
+            self.native_dtype = np.dtype('float32')
+
+    @property
+    def memory_mapped(self):
+        return self._data is not None
+
+    @property
+    def duration(self):
+        return self.frames / self.sr
+
+    def close(self):
+        if self._sf is not None:
+            self._sf.close()
+            self._sf = None
+        self._data = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _bounds(self, start, stop):
+        start = min(max(0, int(start)), self.frames)
+        stop = self.frames if stop is None else min(self.frames, int(stop))
+        return start, max(start, stop)
+
+    def read(self, start=0, stop=None, channel=None, dtype='float32'):
+        """
+        Read frames [start, stop). With dtype=None the native samples of a memory-mapped
+        file are returned as a read-only view (channel must not be None, as a downmix
+        cannot be expressed in the native integer type).
+        """
+        start, stop = self._bounds(start, stop)
+        if dtype is not None and np.dtype(dtype).kind != 'f':
+            raise ValueError(f"Unsupported dtype {dtype!r}: use a float type, or None for native samples.")
+        if self._data is None:
+            self._sf.seek(start)
+            block = self._sf.read(stop - start, dtype=str(np.dtype(dtype or 'float32')), always_2d=True)
+            return self._select(block, channel)
+
+        window = self._data[start:stop]
+        if dtype is None:
+            if channel is None:
+                raise ValueError("A downmix needs a floating point dtype.")
+            return window if channel == "all" else window[:, channel]
+        dtype = np.dtype(dtype)
+        if channel == "all":
+            out = window.astype(dtype)
+            return self._to_float(out, dtype)
+        if channel is not None:
+            out = window[:, channel].astype(dtype)
+            return self._to_float(out, dtype)
+        # Downmix by accumulating one channel at a time: only one output-sized buffer is allocated
+        out = window[:, 0].astype(dtype)
+        for c in range(1, self.channels):
+            out += window[:, c]
+        if self.channels > 1:
+            out /= self.channels
+        return self._to_float(out, dtype)
+
+    def read_time(self, tmin=0.0, tmax=None, channel=None, dtype='float32'):
+        """Same as read(), with bounds in seconds."""
+        stop = None if tmax is None else int(round(tmax * self.sr))
+        return self.read(int(round(tmin * self.sr)), stop, channel=channel, dtype=dtype)
+
+    def blocks(self, blocksize=65536, channel=None, dtype='float32'):
+        """Yield consecutive windows of at most `blocksize` frames."""
+        for start in range(0, self.frames, blocksize):
+            yield self.read(start, start + blocksize, channel=channel, dtype=dtype)
+
+    def _to_float(self, out, dtype):
+        if self._sample_offset:
+            out -= self._sample_offset
+        if self._scale != 1.0:
+            out *= dtype.type(self._scale)
+        return out
+
+    @staticmethod
+    def _select(block, channel):
+        if channel == "all":
+            return block
+        if channel is not None:
+            return np.ascontiguousarray(block[:, channel])
+        return block.mean(axis=1, dtype=block.dtype)
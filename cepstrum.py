@@ -0,0 +1,299 @@
+# cepstrum.py
+"""
+NumPy implementation of Praat's "To PowerCepstrogram" + "Get CPPS", vectorised over
+any leading axes (channels, files...) so that many signals share one batched FFT.
+
+Follows the Praat algorithm (resampling to 2 * max_freq, Gaussian window of
+2 * 3/pitch_floor, pre-emphasis, power cepstrum in dB, time/quefrency smoothing,
+parabolic peak, trend line) with a least-squares trend fit instead of Praat's robust fit, so
+values are not bit-identical to extract_cpp(). Their deviation from Praat has not been
+measured; clinical results should come from extract_cpp() (the service defaults to it).
+"""
+import numpy as np
+import scipy.fft
+
+from resampling import resample_to_rate
+
+# Get CPPS settings used for each method (shared with the Praat script in cpp_analysis)
+CPP_SETTINGS = {
+    "CPP": {"subtract_trend": True, "time_avg_win": 0.001, "quef_avg_win": 0.00005,
+            "trend_type": "Exponential decay"},
+    "CPPS": {"subtract_trend": False, "time_avg_win": 0.01, "quef_avg_win": 0.001,
+             "trend_type": "Straight"},
+}
+PITCH_FLOOR = 60
+TIME_STEP = 0.002
+MAX_FREQ = 5000
+PREEMPHASIS_FROM = 50  # Praat's default; the analyses pass min_f0, as the Praat script does
+TREND_QMIN = 0.001
+BLOCK_FRAMES = 256
+
+
+def cpp_settings(method):
+    return CPP_SETTINGS["CPP" if method.upper() == "CPP" else "CPPS"]
+
+
+def to_analysis_rate(samples, sr, analysis_rate=None, max_freq=MAX_FREQ, axis=-1):
+    """
+    Decimate to 2 * max_freq (or to a lower `analysis_rate`), as Praat does before its
+    PowerCepstrogram. The FFT size, hence the cepstrum, then no longer depends on the
+    recording's sampling rate. Returns (samples, sr).
+    """
+    target = 2 * max_freq if not analysis_rate else min(analysis_rate, 2 * max_freq)
+    return resample_to_rate(samples, sr, target, axis)
+
+
+def frame_layout(sr, pitch_floor=PITCH_FLOOR, time_step=TIME_STEP):
+    """Return (window length, hop) in samples, as Praat's PowerCepstrogram."""
+    n_win = int(round(2 * 3.0 / pitch_floor * sr))
+    hop = max(1, int(round(time_step * sr)))
+    return n_win, hop
+
+
+def count_frames(n_samples, n_win, hop):
+    return 0 if n_samples < n_win else 1 + (n_samples - n_win) // hop
+
+
+def gaussian_window(n):
+    """Praat's Gaussian analysis window."""
+    edge = np.exp(-12.0)
+    i = np.arange(1, n + 1) - 0.5 * (n + 1)
+    return ((np.exp(-48.0 * i * i / (n + 1) ** 2) - edge) / (1 - edge)).astype(np.float32)
+
+
+def frame_signal(x, n_win, hop):
+    """View `x` (..., n) as overlapping frames (..., n_frames, n_win) without copying."""
+    n_frames = count_frames(x.shape[-1], n_win, hop)
+    if n_frames == 0:
+        return np.zeros(x.shape[:-1] + (0, n_win), dtype=x.dtype)
+    return np.lib.stride_tricks.sliding_window_view(x, n_win, axis=-1)[..., ::hop, :][..., :n_frames, :]
+
+
+def quefrency_axis(sr, n_win, max_freq=MAX_FREQ):
+    nfft = 1 << int(np.ceil(np.log2(n_win)))
+    k = min(nfft // 2, int(np.floor(max_freq * nfft / sr)))
+    n_ceps = 2 * k
+    return np.arange(k + 1) / (n_ceps * sr / nfft), nfft, k
+
+
+def power_cepstra(frames, sr, max_freq=MAX_FREQ, preemphasis_from=PREEMPHASIS_FROM, window=None, workers=1):
+    """
+    Power cepstra in dB of `frames` (..., n_frames, n_win), one batched FFT over all
+    leading axes (split over `workers` threads by scipy.fft; keep 1 inside process
+    pools). Frames are expected at 2 * max_freq (see to_analysis_rate); at other rates
+    the zero padding, and with it the values, change with the sampling rate.
+    Returns (quefrency, cepstra) with cepstra of shape (..., n_frames, n_quefrency), float32.
+    """
+    n_win = frames.shape[-1]
+    quefrency, nfft, k = quefrency_axis(sr, n_win, max_freq)
+    if window is None:
+        window = gaussian_window(n_win)
+    a = np.exp(-2 * np.pi * preemphasis_from / sr)
+    # Frames arrive as float32; the transforms run in double precision (float32 FFTs cost ~0.05 dB of CPP)
+    x = np.empty(frames.shape, dtype=np.float64)
+    x[..., 0] = frames[..., 0]
+    np.subtract(frames[..., 1:], a * frames[..., :-1], out=x[..., 1:])
+    x *= window
+    spec = scipy.fft.rfft(x, nfft, axis=-1, workers=workers)[..., :k + 1]
+    log_power = np.abs(spec)
+    np.square(log_power, out=log_power)
+    log_power += 1e-30
+    np.log(log_power, out=log_power)
+    ceps = scipy.fft.irfft(log_power, 2 * k, axis=-1, workers=workers)[..., :k + 1]
+    np.square(ceps, out=ceps)
+    ceps += 1e-30
+    np.log10(ceps, out=ceps)
+    ceps *= 10
+    return quefrency, ceps.astype(np.float32, copy=False)
+
+
+def _moving_average(x, half, axis, lo_bound=None, hi_bound=None):
+    """Centered moving average of width 2*half+1 along `axis`, window clipped at bounds."""
+    if half <= 0:
+        return x
+    axis = axis % x.ndim
+    n = x.shape[axis]
+    idx = np.arange(n)
+    lo = np.maximum(idx - half, 0 if lo_bound is None else lo_bound)
+    hi = np.minimum(idx + half + 1, n if hi_bound is None else hi_bound)
+    shape = list(x.shape)
+    shape[axis] = n + 1
+    csum = np.zeros(shape, dtype=np.float64)
+    np.cumsum(x, axis=axis, out=csum[(slice(None),) * axis + (slice(1, None),)])
+    # Gather along the original axis: no transposed copies of large cepstrograms
+    out = np.take(csum, hi, axis=axis)
+    out -= np.take(csum, lo, axis=axis)
+    shape = [1] * x.ndim
+    shape[axis] = n
+    out /= (hi - lo).reshape(shape)
+    return out.astype(np.float32)
+
+
+def smooth_time(cepstra, n_avg, segment_starts=None):
+    """
+    Average each frame with its neighbours over `n_avg` frames (axis -2). With
+    `segment_starts` (first frame index of each packed signal) the window never
+    crosses into another signal.
+    """
+    half = int(n_avg) // 2
+    if half <= 0 or cepstra.shape[-2] == 0:
+        return cepstra
+    lo_bound = hi_bound = None
+    if segment_starts is not None:
+        n = cepstra.shape[-2]
+        starts = np.asarray(segment_starts)
+        ends = np.append(starts[1:], n)
+        seg = np.searchsorted(starts, np.arange(n), side='right') - 1
+        lo_bound, hi_bound = starts[seg], ends[seg]
+    return _moving_average(cepstra, half, -2, lo_bound, hi_bound)
+
+
+def smooth_quefrency(cepstra, n_avg):
+    return _moving_average(cepstra, int(n_avg) // 2, -1)
+
+
+def trend_axis(quefrency, trend_type):
+    if trend_type.lower().startswith("exponential"):
+        return np.log(np.maximum(quefrency, quefrency[1]))
+    return quefrency
+
+
+def fit_trend(quefrency, cepstra, trend_type="Straight", qmin=TREND_QMIN):
+    """Least-squares trend line per cepstrum; returns (slope, intercept) arrays."""
+    i0 = int(np.searchsorted(quefrency, qmin))
+    x = trend_axis(quefrency, trend_type)[i0:]
+    xc = x - x.mean()
+    y = cepstra[..., i0:]
+    slope = (y @ xc.astype(y.dtype)) / np.dot(xc, xc)
+    intercept = y.mean(axis=-1) - slope * x.mean()
+    return slope, intercept
+
+
+def trend_line(quefrency, slope, intercept, trend_type="Straight"):
+    x = trend_axis(quefrency, trend_type)
+    return np.asarray(intercept)[..., None] + np.asarray(slope)[..., None] * x
+
+
+def cepstral_peak_prominence(quefrency, cepstra, min_f0=60, max_f0=330, trend_type="Straight",
+                             qmin=TREND_QMIN):
+    """
+    Peak prominence above the trend line for every cepstrum in `cepstra` (..., n_quefrency).
+    Returns (cpp, peak_quefrency, slope, intercept), each of shape (...).
+    """
+    nq = len(quefrency)
+    lo = max(1, int(np.searchsorted(quefrency, 1.0 / max_f0)))
+    hi = min(nq - 1, int(np.searchsorted(quefrency, 1.0 / min_f0, side='right')))
+    k = np.argmax(cepstra[..., lo:hi], axis=-1) + lo
+    y0 = np.take_along_axis(cepstra, k[..., None], -1)[..., 0]
+    ym = np.take_along_axis(cepstra, k[..., None] - 1, -1)[..., 0]
+    yp = np.take_along_axis(cepstra, k[..., None] + 1, -1)[..., 0]
+    denom = ym - 2 * y0 + yp
+    safe = np.where(denom < 0, denom, -1)
+    delta = np.where(denom < 0, 0.5 * (ym - yp) / safe, 0)
+    peak = y0 - 0.25 * (ym - yp) * delta
+    peak_q = quefrency[k] + delta * (quefrency[1] - quefrency[0])
+    slope, intercept = fit_trend(quefrency, cepstra, trend_type, qmin)
+    peak_x = np.log(peak_q) if trend_type.lower().startswith("exponential") else peak_q
+    return peak - (intercept + slope * peak_x), peak_q, slope, intercept
+
+
+def smoothing_widths(quefrency, method="CPPS", time_step=TIME_STEP):
+    """(frames, quefrency bins) averaged by the method's time and quefrency smoothing."""
+    settings = cpp_settings(method)
+    dq = quefrency[1] - quefrency[0]
+    return round(settings["time_avg_win"] / time_step), round(settings["quef_avg_win"] / dq)
+
+
+def detrend(quefrency, cepstra, trend_type="Straight"):
+    """Subtract each cepstrum's own trend line."""
+    slope, intercept = fit_trend(quefrency, cepstra, trend_type)
+    return cepstra - trend_line(quefrency, slope, intercept, trend_type).astype(np.float32)
+
+
+def smooth_cepstra(quefrency, cepstra, method="CPPS", time_step=TIME_STEP, segment_starts=None):
+    """Apply the method's trend subtraction and time/quefrency smoothing (Praat's Get CPPS)."""
+    settings = cpp_settings(method)
+    if settings["subtract_trend"]:
+        cepstra = detrend(quefrency, cepstra, settings["trend_type"])
+    n_time, n_quef = smoothing_widths(quefrency, method, time_step)
+    cepstra = smooth_time(cepstra, n_time, segment_starts)
+    return smooth_quefrency(cepstra, n_quef)
+
+
+def cepstrogram(samples, sr, pitch_floor=PITCH_FLOOR, time_step=TIME_STEP, max_freq=MAX_FREQ,
+                block_frames=BLOCK_FRAMES, preemphasis_from=PREEMPHASIS_FROM, workers=1):
+    """
+    Power cepstrogram of `samples` (..., n), decimated to 2 * max_freq first. All leading
+    axes are transformed together; frames are processed `block_frames` at a time to
+    bound the temporary buffers.
+    Returns (times, quefrency, cepstra) with cepstra of shape (..., n_frames, n_quefrency).
+    """
+    samples, sr = to_analysis_rate(np.asarray(samples, dtype=np.float32), sr, max_freq=max_freq)
+    n_win, hop = frame_layout(sr, pitch_floor, time_step)
+    frames = frame_signal(samples, n_win, hop)
+    quefrency, cepstra = power_cepstra_blocked(frames, sr, max_freq, block_frames,
+                                               preemphasis_from=preemphasis_from, workers=workers)
+    times = (np.arange(frames.shape[-2]) * hop + 0.5 * n_win) / sr
+    return times, quefrency, cepstra
+
+
+def power_cepstra_blocked(frames, sr, max_freq=MAX_FREQ, block_frames=BLOCK_FRAMES, rows=None,
+                          preemphasis_from=PREEMPHASIS_FROM, workers=1):
+    """
+    power_cepstra() over `block_frames` frames at a time, into one preallocated output.
+    With `rows`, the frames are frames[..., rows, :] (e.g. a strided view holding every
+    window position), gathered one block at a time so they are never all copied.
+    """
+    n_win = frames.shape[-1]
+    n_frames = frames.shape[-2] if rows is None else len(rows)
+    quefrency, _, _ = quefrency_axis(sr, n_win, max_freq)
+    window = gaussian_window(n_win)
+    cepstra = np.empty(frames.shape[:-2] + (n_frames, len(quefrency)), dtype=np.float32)
+    for i in range(0, n_frames, block_frames):
+        block = frames[..., i:i + block_frames, :] if rows is None else frames[..., rows[i:i + block_frames], :]
+        _, cepstra[..., i:i + block_frames, :] = power_cepstra(block, sr, max_freq, preemphasis_from,
+                                                               window=window, workers=workers)
+    return quefrency, cepstra
+
+
+def analyze_signal(samples, sr, method="CPPS", min_f0=60, max_f0=330, pitch_floor=PITCH_FLOOR,
+                   time_step=TIME_STEP, max_freq=MAX_FREQ, workers=1):
+    """
+    CPP/CPPS of `samples` (n,) or (channels, n) in one pass.
+    Returns dict with "cpp" (mean over frames, per leading index), "contour" (per frame),
+    "times", "quefrency", and the smoothed cepstrum + trend at the centre frame
+    ("spectrum", "trend"), mirroring extract_cpp().
+    """
+    settings = cpp_settings(method)
+    times, quefrency, cepstra = cepstrogram(samples, sr, pitch_floor, time_step, max_freq,
+                                            preemphasis_from=min_f0, workers=workers)
+    if len(times) == 0:
+        raise ValueError("Signal is shorter than one analysis window "
+                         f"({2 * 3.0 / pitch_floor:.3f} s).")
+    cepstra = smooth_cepstra(quefrency, cepstra, method, time_step)
+    contour, _, slope, intercept = cepstral_peak_prominence(
+        quefrency, cepstra, min_f0, max_f0, settings["trend_type"])
+    mid = len(times) // 2
+    return {
+        "cpp": contour.mean(axis=-1),
+        "contour": contour,
+        "times": times,
+        "quefrency": quefrency,
+        "spectrum": cepstra[..., mid, :],
+        "trend": trend_line(quefrency, slope[..., mid], intercept[..., mid], settings["trend_type"]),
+    }
+
+
+def synthetic_vowel(sr, f0=120, duration=1.0, noise=0.05, seed=0, max_harmonic_freq=7500):
+    """
+    Harmonic vowel-like test signal plus aspiration-like partials, defined in continuous
+    time so that it is the same sound at every sampling rate (sr > 2 * max_harmonic_freq).
+    """
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    x = np.zeros(len(t))
+    for k in range(1, int(max_harmonic_freq // f0) + 1):
+        x += np.cos(2 * np.pi * k * f0 * t + rng.uniform(0, 2 * np.pi)) / k
+    for f, phase in zip(rng.uniform(50, max_harmonic_freq, 400), rng.uniform(0, 2 * np.pi, 400)):
+        x += noise * np.cos(2 * np.pi * f * t + phase)
+    return (0.1 * x / np.abs(x).max()).astype(np.float32)
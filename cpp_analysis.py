@@ -5,6 +5,11 @@ import subprocess
 import uuid
 import soundfile as sf
 
+from audio_io import AudioReader
+from batch_cepstrum import batch_extract_cpp_packed
+from cepstrum import analyze_signal, cpp_settings, to_analysis_rate
+from resampling import resample_to_rate
+
 def parse_praat_powercepstrum_txt(filepath):
     """Parse Praat PowerCepstrum short text file and return (x, y) arrays"""
     with open(filepath, 'r') as f:
@@ -30,12 +35,15 @@ def extract_voiced_only(audio_path, min_f0=50, max_f0=500):
     Extract only voiced segments from the audio (set unvoiced to zero), using Parselmouth.
     Returns the path to a new WAV file with only voiced parts.
     """
-    snd = parselmouth.Sound(audio_path)
+    # First channel only, in float32; Praat gets a float64 copy of that channel for the pitch pass
+    with AudioReader(audio_path) as audio:
+        samples = audio.read(channel=0)
+        sr = audio.sr
+    snd = parselmouth.Sound(samples, sampling_frequency=sr)
     pitch = snd.to_pitch(time_step=0.01, pitch_floor=min_f0, pitch_ceiling=max_f0)
+    del snd
     values = pitch.selected_array['frequency']
     times = pitch.xs()
-    samples = snd.values[0]
-    sr = snd.sampling_frequency
     voiced_mask = np.zeros_like(samples, dtype=bool)
     for t, f0 in zip(times, values):
         idx = int(t * sr)
@@ -44,10 +52,10 @@ def extract_voiced_only(audio_path, min_f0=50, max_f0=500):
             left = max(0, idx - int(0.005 * sr))
             right = min(len(samples), idx + int(0.005 * sr))
             voiced_mask[left:right] = True
-    voiced_samples = samples * voiced_mask
+    samples[~voiced_mask] = 0
     dirname = os.path.dirname(audio_path)
     temp_wav = os.path.join(dirname, f"vad_{uuid.uuid4().hex}.wav")
-    sf.write(temp_wav, voiced_samples, int(sr))
+    sf.write(temp_wav, samples, int(sr))
     return temp_wav
 
 def remove_pauses_with_parselmouth(audio_path, silence_threshold=-35):
@@ -105,7 +113,7 @@ def preprocess_connected_speech(audio_path, min_f0=50, max_f0=500,
 
 def extract_cpp(audio_path, region=None, method="CPP", file_type="Sustained vowel",
                 praat_path="praat.exe", min_f0=60, max_f0=330,
-                vad_enabled=True, pause_removal_enabled=True):
+                vad_enabled=True, pause_removal_enabled=True, analysis_rate=None):
     # ===== PREPROCESSING FOR CONNECTED SPEECH =====
     if file_type.lower().startswith("connected"):
         wav_path_for_praat = preprocess_connected_speech(
@@ -116,26 +124,26 @@ def extract_cpp(audio_path, region=None, method="CPP", file_type="Sustained vowe
     else:
         wav_path_for_praat = audio_path
 
-    snd = parselmouth.Sound(wav_path_for_praat)
-    duration = snd.get_total_duration()
-    if region is not None:
-        start, end = max(0, region[0]), min(duration, region[1])
-        snd = snd.extract_part(from_time=start, to_time=end, preserve_times=False)
-    else:
-        start, end = 0, duration
+    # Only the selected region is read, downmixed to mono float32
+    with AudioReader(wav_path_for_praat) as audio:
+        duration = audio.duration
+        if region is not None:
+            start, end = max(0, region[0]), min(duration, region[1])
+        else:
+            start, end = 0, duration
+        samples = audio.read_time(start, end)
+        sr = audio.sr
 
     center_time = (start + end) / 2
 
-    if method.upper() == "CPP":
-        subtract_trend = "yes"
-        time_avg_win = 0.001
-        quef_avg_win = 0.00005
-        trend_type = "Exponential decay"
-    else:  # CPPS
-        subtract_trend = "no"
-        time_avg_win = 0.01
-        quef_avg_win = 0.001
-        trend_type = "Straight"
+    # Praat only analyses up to 5000 Hz: decimate once here so every FFT works at the analysis rate
+    samples, sr = resample_to_rate(samples, sr, analysis_rate)
+
+    settings = cpp_settings(method)
+    subtract_trend = "yes" if settings["subtract_trend"] else "no"
+    time_avg_win = settings["time_avg_win"]
+    quef_avg_win = settings["quef_avg_win"]
+    trend_type = settings["trend_type"]
 
     temp_folder = os.path.join(os.path.dirname(os.path.abspath(__file__)), "temp_praat")
     os.makedirs(temp_folder, exist_ok=True)
@@ -144,7 +152,8 @@ def extract_cpp(audio_path, region=None, method="CPP", file_type="Sustained vowe
     temp_script_path = os.path.join(temp_folder, f"{file_id}.praat")
     output_file = temp_wav_path + ".output.txt"
     cepstrum_file = temp_wav_path + ".ceps.txt"
-    snd.save(temp_wav_path, "WAV")
+    sf.write(temp_wav_path, samples, int(round(sr)), subtype='FLOAT')
+    del samples
 
     # Use F0 min/max in Praat script
     script_content = f'''
@@ -220,15 +229,58 @@ Write to short text file: "{cepstrum_file}"
         "region": (start, end)
     }
 
+def extract_cpp_multichannel(audio_path, region=None, method="CPP", min_f0=60, max_f0=330,
+                             analysis_rate=None):
+    """
+    Per-channel CPP/CPPS of a multichannel recording (e.g. EGG + microphone) in one pass.
+    All channels are framed together and go through a single batched FFT (cepstrum.py),
+    instead of one Praat run per channel. Connected-speech preprocessing is not applied.
+    Returns the extract_cpp() keys with a leading channel axis, plus the per-frame
+    "contours" and their "times".
+    """
+    with AudioReader(audio_path) as audio:
+        duration = audio.duration
+        if region is not None:
+            start, end = max(0, region[0]), min(duration, region[1])
+        else:
+            start, end = 0, duration
+        samples = audio.read_time(start, end, channel="all").T
+        sr = audio.sr
+        n_channels = audio.channels
+    samples, sr = to_analysis_rate(samples, sr, analysis_rate)
+
+    res = analyze_signal(np.ascontiguousarray(samples), sr, method=method, min_f0=min_f0, max_f0=max_f0)
+    return {
+        "cpp": [float(v) for v in res["cpp"]],
+        "contours": res["contour"],
+        "times": res["times"] + start,
+        "quefrency": res["quefrency"],
+        "spectrum": res["spectrum"],
+        "trend": res["trend"],
+        "channels": n_channels,
+        "region": (start, end)
+    }
+
 def batch_extract_cpp(folder_path, method="CPP", file_type="Sustained vowel", praat_path="praat.exe",
                      save_dir=None, min_f0=60, max_f0=330,
-                     vad_enabled=True, pause_removal_enabled=True):
+                     vad_enabled=True, pause_removal_enabled=True, analysis_rate=None, engine="praat"):
     results = []
     if save_dir is None:
         save_dir = folder_path
     if not os.path.exists(save_dir):
         os.makedirs(save_dir)
 
+    # engine="numpy": packed cross-file engine (no Praat runs, no cepstrum arrays in the results)
+    if engine == "numpy":
+        if file_type.lower().startswith("connected"):
+            raise ValueError("The NumPy batch engine supports sustained vowels only.")
+        fnames = [f for f in sorted(os.listdir(folder_path)) if f.lower().endswith(".wav")]
+        results, _ = batch_extract_cpp_packed(
+            [os.path.join(folder_path, f) for f in fnames], method=method,
+            min_f0=min_f0, max_f0=max_f0, analysis_rate=analysis_rate
+        )
+        return results
+
     for fname in sorted(os.listdir(folder_path)):
         if fname.lower().endswith(".wav"):
             fpath = os.path.join(folder_path, fname)
@@ -237,7 +289,8 @@ def batch_extract_cpp(folder_path, method="CPP", file_type="Sustained vowel", pr
                     fpath, region=None, method=method, file_type=file_type,
                     praat_path=praat_path, min_f0=min_f0, max_f0=max_f0,
                     vad_enabled=vad_enabled,
-                    pause_removal_enabled=pause_removal_enabled
+                    pause_removal_enabled=pause_removal_enabled,
+                    analysis_rate=analysis_rate
                 )
                 res['filename'] = fname
                 results.append(res)
@@ -36,3 +36,27 @@ def get_wav_files_in_folder(folder_path):
         if fname.lower().endswith(".wav"):
             files.append(os.path.join(folder_path, fname))
     return files
+
+def save_decimation_report(rows, filename):
+    """
+    Saves the per-file rows of resampling.decimation_report() to CSV.
+    """
+    fieldnames = ['filename', 'engine', 'source_rate', 'target_rate', 'analysis_rate', 'cpp_full', 'cpp',
+                  'deviation', 'speedup', 'error']
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=fieldnames)
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: (f"{v:.4f}" if isinstance(v, float) else v) for k, v in row.items()})
+
+def save_group_summary(rows, filename):
+    """
+    Saves the rows of aggregate.GroupedStats.summary() (one per group) to CSV.
+    """
+    if not rows:
+        return
+    with open(filename, 'w', newline='') as csvfile:
+        writer = csv.DictWriter(csvfile, fieldnames=list(rows[0].keys()))
+        writer.writeheader()
+        for row in rows:
+            writer.writerow({k: (f"{v:.3f}" if isinstance(v, float) else v) for k, v in row.items()})
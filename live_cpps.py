@@ -0,0 +1,229 @@
+# live_cpps.py
+"""
+Incremental CPP/CPPS for live monitoring (biofeedback): push audio as it arrives and
+get frame-level values plus a rolling smoothed value as soon as each frame is complete.
+
+Input is decimated to 2 * max_freq on the fly (resampling.StreamResampler, the same
+filter as the file-based engine), then each frame goes through the per-frame
+functions of cepstrum.py (power_cepstra, detrend, smooth_quefrency,
+cepstral_peak_prominence), so frame values match the file-based engine. Two
+streaming differences: time smoothing over neighbouring frames is trailing instead
+of centred, and the rolling value is the mean of the frame values of the last
+`rolling_window` seconds.
+
+Latency
+-------
+A frame is analysed inside the push() that delivers its last sample, so:
+  * algorithmic delay (newest sample -> centre of the frame it completes) is half a
+    window, 3 / pitch_floor s (50 ms at 60 Hz), plus (n_time_avg - 1) / 2 frames of
+    trailing time smoothing for CPPS (4 ms), plus the decimation filter's delay
+    (3.2 ms at 2 * max_freq = 10 kHz);
+  * compute per push is at most frames_per_push(chunk) frame analyses, i.e.
+    ceil(decimated chunk / hop) + 1; each costs one rfft + irfft of the window's FFT
+    size (see benchmark_push() / replay() for measured values on a given machine).
+
+Allocation
+----------
+The resampler's input, scratch and output buffers, the ring buffer, cepstra history,
+rolling window and output buffers are allocated once in __init__ for chunks of up to
+`max_chunk` samples (grown only if a larger chunk arrives). push() copies the chunk
+into them and allocates no buffer of its own; per frame, only the cepstrum.py
+functions' FFT-sized temporaries are allocated (about 40 KB peak, freed before the
+next frame).
+"""
+import time
+
+import numpy as np
+
+from audio_io import AudioReader
+from cepstrum import (MAX_FREQ, PITCH_FLOOR, TIME_STEP, cepstral_peak_prominence, cpp_settings, detrend,
+                      frame_layout, gaussian_window, power_cepstra, quefrency_axis, smooth_quefrency,
+                      smoothing_widths)
+from resampling import StreamResampler
+
+
+class IncrementalCPPS:
+    def __init__(self, sr, method="CPPS", min_f0=60, max_f0=330, pitch_floor=PITCH_FLOOR,
+                 time_step=TIME_STEP, max_freq=MAX_FREQ, rolling_window=1.0, max_chunk=None):
+        self.sr = sr
+        self.method = method
+        self.min_f0 = min_f0
+        self.max_f0 = max_f0
+        self.max_freq = max_freq
+        settings = cpp_settings(method)
+        self.subtract_trend = settings["subtract_trend"]
+        self.trend_type = settings["trend_type"]
+        # Frames are cut from the decimated stream, at self.rate
+        self._resampler = StreamResampler(sr, 2 * max_freq, max_chunk=max_chunk)
+        self.rate = self._resampler.rate
+        self.n_win, self.hop = frame_layout(self.rate, pitch_floor, time_step)
+        self.time_step = self.hop / self.rate
+        self.quefrency = quefrency_axis(self.rate, self.n_win, max_freq)[0]
+        nq = len(self.quefrency)
+
+        # Ring buffer stored twice so the latest window is always one contiguous slice
+        self._ring = np.zeros(2 * self.n_win, dtype=np.float32)
+        self._pos = 0
+        self.samples_seen = 0
+        self._next_frame_end = self.n_win
+        self._window = gaussian_window(self.n_win)
+
+        # Trailing time smoothing: running sum over the last n_time_avg cepstra
+        n_time, self.n_quef_avg = smoothing_widths(self.quefrency, method, time_step)
+        self.n_time_avg = 2 * (int(n_time) // 2) + 1
+        self._hist = np.zeros((self.n_time_avg, nq), dtype=np.float64)
+        self._hist_sum = np.zeros(nq, dtype=np.float64)
+        self._hist_count = 0
+        self._avg = np.empty(nq, dtype=np.float32)
+
+        # Rolling mean of frame values
+        self._roll = np.zeros(max(1, int(round(rolling_window / self.time_step))), dtype=np.float64)
+        self._roll_sum = 0.0
+        self._roll_count = 0
+        self._roll_pos = 0
+
+        # Output buffers returned by push()
+        self._out_cpp = self._out_times = self._out_smoothed = np.empty(0)
+        self._reserve(self.frames_per_push(max_chunk or int(sr)))
+
+    @property
+    def algorithmic_latency(self):
+        """Seconds between the newest sample and the centre of the frame it completes."""
+        return (self.n_win / 2 + (self.n_time_avg - 1) / 2 * self.hop) / self.rate + self._resampler.delay
+
+    def frames_per_push(self, chunk_size):
+        """Worst-case number of frames one push of `chunk_size` input samples can complete."""
+        decimated = -(-int(chunk_size) * self._resampler.up // self._resampler.down)
+        return -(-decimated // self.hop) + 1
+
+    @property
+    def smoothed(self):
+        """Mean CPP/CPPS over the rolling window, or None before the first frame."""
+        return self._roll_sum / self._roll_count if self._roll_count else None
+
+    def reset(self):
+        self._resampler.reset()
+        self._ring[:] = 0
+        self._pos = 0
+        self.samples_seen = 0
+        self._next_frame_end = self.n_win
+        self._hist[:] = 0
+        self._hist_sum[:] = 0
+        self._hist_count = 0
+        self._roll[:] = 0
+        self._roll_sum = 0.0
+        self._roll_count = 0
+        self._roll_pos = 0
+
+    def push(self, samples):
+        """
+        Feed a chunk of mono samples (any length). Returns (times, values, smoothed) for the
+        frames completed by this chunk, `smoothed` being the rolling value after each frame.
+        These are views into internal buffers, valid until the next push().
+        """
+        self._reserve(self.frames_per_push(len(samples)))
+        samples = self._resampler.push(samples)
+        n_out = 0
+        i = 0
+        while i < len(samples):
+            take = min(len(samples) - i, self._next_frame_end - self.samples_seen)
+            self._write(samples[i:i + take])
+            i += take
+            if self.samples_seen == self._next_frame_end:
+                self._out_cpp[n_out] = self._analyze_frame()
+                # The value averages the last n_time_avg frames: it belongs to the middle one
+                centre = self.samples_seen - self.n_win / 2 - (self.n_time_avg // 2) * self.hop
+                self._out_times[n_out] = centre / self.rate
+                self._out_smoothed[n_out] = self._roll_sum / self._roll_count
+                n_out += 1
+                self._next_frame_end += self.hop
+        return self._out_times[:n_out], self._out_cpp[:n_out], self._out_smoothed[:n_out]
+
+    def _reserve(self, n_frames):
+        if n_frames > len(self._out_cpp):
+            self._out_cpp = np.empty(n_frames, dtype=np.float64)
+            self._out_times = np.empty(n_frames, dtype=np.float64)
+            self._out_smoothed = np.empty(n_frames, dtype=np.float64)
+
+    def _write(self, chunk):
+        n = len(chunk)
+        if n >= self.n_win:
+            chunk = chunk[-self.n_win:]
+            self._ring[:self.n_win] = chunk
+            self._ring[self.n_win:] = chunk
+            self._pos = 0
+        else:
+            first = min(n, self.n_win - self._pos)
+            for offset in (0, self.n_win):
+                self._ring[offset + self._pos:offset + self._pos + first] = chunk[:first]
+                self._ring[offset:offset + n - first] = chunk[first:]
+            self._pos = (self._pos + n) % self.n_win
+        self.samples_seen += n
+
+    def _analyze_frame(self):
+        frame = self._ring[self._pos:self._pos + self.n_win]
+        ceps = power_cepstra(frame, self.rate, self.max_freq, self.min_f0, window=self._window)[1]
+        if self.subtract_trend:
+            ceps = detrend(self.quefrency, ceps, self.trend_type)
+
+        # Trailing time average
+        slot = self._hist_count % self.n_time_avg
+        self._hist_sum -= self._hist[slot]
+        self._hist[slot] = ceps
+        self._hist_sum += self._hist[slot]
+        self._hist_count += 1
+        np.divide(self._hist_sum, min(self._hist_count, self.n_time_avg), out=self._avg, casting='unsafe')
+
+        ceps = smooth_quefrency(self._avg, self.n_quef_avg)
+        value = float(cepstral_peak_prominence(self.quefrency, ceps, self.min_f0, self.max_f0,
+                                               self.trend_type)[0])
+        if self._roll_count == len(self._roll):
+            self._roll_sum -= self._roll[self._roll_pos]
+        else:
+            self._roll_count += 1
+        self._roll[self._roll_pos] = value
+        self._roll_sum += value
+        self._roll_pos = (self._roll_pos + 1) % len(self._roll)
+        return value
+
+
+def benchmark_push(analyzer, chunk_size, repeats=50):
+    """Worst and mean wall time of push() for white-noise chunks of `chunk_size` samples."""
+    rng = np.random.default_rng(0)
+    chunk = (0.1 * rng.standard_normal(chunk_size)).astype(np.float32)
+    for _ in range(-(-int(analyzer.n_win * analyzer.sr / analyzer.rate) // chunk_size) + 1):
+        analyzer.push(chunk)
+    timings = []
+    for _ in range(repeats):
+        t0 = time.perf_counter()
+        analyzer.push(chunk)
+        timings.append(time.perf_counter() - t0)
+    analyzer.reset()
+    return max(timings), float(np.mean(timings))
+
+
+def replay(path, chunk_size=512, **kwargs):
+    """
+    Stream a file through IncrementalCPPS in chunks of `chunk_size` samples, as a live
+    input would arrive. Returns dict with frame "times"/"cpp", the rolling "smoothed"
+    value after each frame, and the worst/mean push() time against the chunk duration.
+    """
+    times, values, smoothed, push_times = [], [], [], []
+    with AudioReader(path) as audio:
+        analyzer = IncrementalCPPS(audio.sr, max_chunk=chunk_size, **kwargs)
+        for chunk in audio.blocks(chunk_size):
+            t0 = time.perf_counter()
+            t, v, s = analyzer.push(chunk)
+            push_times.append(time.perf_counter() - t0)
+            times.extend(t)
+            values.extend(v)
+            smoothed.extend(s)
+    return {
+        "times": np.array(times),
+        "cpp": np.array(values),
+        "smoothed": np.array(smoothed),
+        "chunk_duration": chunk_size / analyzer.sr,
+        "max_push_time": max(push_times) if push_times else 0.0,
+        "mean_push_time": float(np.mean(push_times)) if push_times else 0.0,
+        "algorithmic_latency": analyzer.algorithmic_latency,
+    }
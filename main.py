@@ -1,20 +1,26 @@
+import time
+STARTUP_T0 = time.perf_counter()
+
 import tkinter as tk
 from tkinter import filedialog, messagebox
 from tkinter import ttk
-from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-from matplotlib.widgets import SpanSelector
-import matplotlib
-matplotlib.use('TkAgg')
-import matplotlib.pyplot as plt
-import numpy as np
-import soundfile as sf
 import os
 import shutil
+import sys
+import threading
 
-from cpp_analysis import extract_cpp, batch_extract_cpp
 from file_utils import save_csv
-from spectrogram import plot_praat_spectrogram
 
+# Heavy analysis stack (numpy, matplotlib, scipy, parselmouth): imported by
+# load_analysis_modules() in a background thread once the window is up
+np = plt = FigureCanvasTkAgg = SpanSelector = None
+AudioReader = extract_cpp = batch_extract_cpp = plot_praat_spectrogram = None
+ANALYSIS_RATES = []
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+LOGO_PATH = os.path.join(APP_DIR, "logo.png")
+LOGO_THUMB_PATH = os.path.join(APP_DIR, "logo_thumb.png")
+LOGO_SIZE = (200, 200)
 BG_COLOR = "#CDCDC1"
 #b0afa6
 #CDCDC1
@@ -24,6 +30,37 @@ ROI_COLOR = "red"
 ROI_ALPHA = 0.25
 APP_VERSION = "1.0.0"
 
+def load_analysis_modules():
+    """Import the analysis stack into this module's globals (safe to call from a worker thread)."""
+    global np, plt, FigureCanvasTkAgg, SpanSelector, AudioReader, extract_cpp, batch_extract_cpp
+    global plot_praat_spectrogram, ANALYSIS_RATES
+    import matplotlib
+    matplotlib.use('TkAgg')
+    import matplotlib.pyplot as plt
+    from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+    from matplotlib.widgets import SpanSelector
+    import numpy as np
+    from audio_io import AudioReader
+    from cpp_analysis import extract_cpp, batch_extract_cpp
+    from resampling import ANALYSIS_RATES
+    from spectrogram import plot_praat_spectrogram
+
+def logo_thumbnail():
+    """
+    Path of the pre-scaled logo. Uses the thumbnail shipped next to main.py; if it is
+    missing, scales logo.png once with PIL into the user cache directory.
+    """
+    if os.path.exists(LOGO_THUMB_PATH):
+        return LOGO_THUMB_PATH
+    cache_dir = os.path.join(os.environ.get("LOCALAPPDATA") or os.path.join(os.path.expanduser("~"), ".cache"),
+                             "cepstralvox")
+    cached = os.path.join(cache_dir, f"logo_{LOGO_SIZE[0]}x{LOGO_SIZE[1]}.png")
+    if not os.path.exists(cached) or os.path.getmtime(cached) < os.path.getmtime(LOGO_PATH):
+        from PIL import Image
+        os.makedirs(cache_dir, exist_ok=True)
+        Image.open(LOGO_PATH).resize(LOGO_SIZE).save(cached)
+    return cached
+
 def plot_quefrency_figure(res, method, save_path=None, show=False):
     q = np.array(res['quefrency']) * 1000  # ms
     s = res['spectrum']
@@ -77,7 +114,7 @@ class CPPApp:
         self.root.title("Cepstral Vox version 1.0.1")
         self.root.configure(bg=BG_COLOR)
         self.audio_path = None
-        self.audio_data = None
+        self.audio = None
         self.sr = None
         self.region = None
         self.analysis_result = None
@@ -92,9 +129,8 @@ class CPPApp:
         top.pack(side=tk.TOP, fill=tk.X, padx=12, pady=4)
 
         try:
-            from PIL import Image, ImageTk
-            logo_img = Image.open("logo.png").resize((200, 200))
-            self.logo = ImageTk.PhotoImage(logo_img)
+            # Tk reads PNG natively: no PIL import or resize on the startup path
+            self.logo = tk.PhotoImage(file=logo_thumbnail())
             tk.Label(top, image=self.logo, bg=BG_COLOR).pack(side=tk.LEFT, padx=(5, 16))
         except Exception:
             tk.Label(top, text="[Logo]", bg=BG_COLOR, font=FONT).pack(side=tk.LEFT, padx=(5, 16))
@@ -102,7 +138,8 @@ class CPPApp:
         btn_row = tk.Frame(top, bg=BG_COLOR)
         btn_row.pack(side=tk.LEFT, expand=True)
 
-        self.open_btn = tk.Button(btn_row, text="Open WAV File", font=BTN_FONT, command=self.load_audio)
+        self.open_btn = tk.Button(btn_row, text="Open WAV File", font=BTN_FONT, command=self.load_audio,
+                                  state=tk.DISABLED)
         self.open_btn.pack(side=tk.LEFT, padx=3, pady=2, ipadx=6, ipady=2)
 
         self.file_type_var = tk.StringVar(value="Sustained vowel")
@@ -115,6 +152,15 @@ class CPPApp:
             tk.Radiobutton(btn_row, text=label, variable=self.analysis_type_var, value=label,
                 bg=BG_COLOR, font=BTN_FONT).pack(side=tk.LEFT, padx=4)
 
+        # ------------------- Analysis Sample Rate -------------------
+        tk.Label(btn_row, text="Analysis rate (Hz):", font=BTN_FONT, bg=BG_COLOR).pack(side=tk.LEFT, padx=(14, 2))
+        self.analysis_rate_var = tk.StringVar(value="Full")
+        self.analysis_rate_menu = ttk.Combobox(btn_row, textvariable=self.analysis_rate_var,
+            values=["Full"], state="readonly", width=7, font=BTN_FONT)
+        self.analysis_rate_menu.pack(side=tk.LEFT)
+        self.analysis_rate_menu.bind("<<ComboboxSelected>>", self.on_analysis_rate_change)
+        # ------------------------------------------------------------
+
         # ------------------- F0 Range Controls -------------------
         self.f0_min_var = tk.DoubleVar(value=60)
         self.f0_max_var = tk.DoubleVar(value=330)
@@ -143,7 +189,8 @@ class CPPApp:
         self.pause_removal_check.pack(side=tk.LEFT, padx=(2, 8))
         # ------------------------------------------------------------
 
-        self.batch_btn = tk.Button(btn_row, text="Batch Process", font=BTN_FONT, command=self.batch_process)
+        self.batch_btn = tk.Button(btn_row, text="Batch Process", font=BTN_FONT, command=self.batch_process,
+                                   state=tk.DISABLED)
         self.batch_btn.pack(side=tk.LEFT, padx=10, ipadx=5, ipady=2)
 
         self.loaded_file_label = tk.Label(top, text="No file loaded", fg="gray", bg=BG_COLOR, font=BTN_FONT)
@@ -155,14 +202,15 @@ class CPPApp:
         )
         self.result_display.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(2, 5))
 
-        center = tk.Frame(root, relief=tk.SUNKEN, bg=BG_COLOR, borderwidth=1)
-        center.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=7)
-        self.fig, self.ax = plt.subplots(figsize=(9, 3.4))
-        self.fig.patch.set_facecolor(BG_COLOR)
-        self.canvas = FigureCanvasTkAgg(self.fig, master=center)
-        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        # The matplotlib canvas replaces this placeholder once the analysis modules are loaded
+        self.center = tk.Frame(root, relief=tk.SUNKEN, bg=BG_COLOR, borderwidth=1, width=900, height=340)
+        self.center.pack(side=tk.TOP, fill=tk.BOTH, expand=True, padx=10, pady=7)
+        self.fig = self.ax = self.canvas = None
+        self.placeholder = tk.Label(self.center, text="Loading analysis modules...", fg="gray",
+                                    bg=BG_COLOR, font=FONT)
+        self.placeholder.place(relx=0.5, rely=0.5, anchor="center")
 
-        self.status_label = tk.Label(root, text="", fg="#14598d", bg=BG_COLOR, font=BTN_FONT)
+        self.status_label = tk.Label(root, text="Starting...", fg="#14598d", bg=BG_COLOR, font=BTN_FONT)
         self.status_label.pack(side=tk.TOP, fill=tk.X, padx=10, pady=(0, 4))
 
         bot = tk.Frame(root, bg=BG_COLOR)
@@ -182,13 +230,55 @@ class CPPApp:
         self.about_btn = tk.Button(bot, text="About", font=BTN_FONT, command=self.show_about)
         self.about_btn.pack(side=tk.RIGHT, padx=12, ipadx=8)
 
+    def start_loading(self, exit_when_ready=False):
+        """Import the analysis modules in a background thread; the UI stays responsive meanwhile."""
+        self.window_time = time.perf_counter() - STARTUP_T0
+        self.exit_when_ready = exit_when_ready
+        self.load_error = None
+
+        def worker():
+            try:
+                load_analysis_modules()
+            except Exception as e:
+                self.load_error = e
+
+        self.loader = threading.Thread(target=worker, daemon=True)
+        self.loader.start()
+        self.root.after(50, self.poll_loading)
+
+    def poll_loading(self):
+        # Tk is not thread-safe: the worker only imports, widgets are built here on the main thread
+        if self.loader.is_alive():
+            self.root.after(50, self.poll_loading)
+            return
+        if self.load_error is not None:
+            self.placeholder.config(text=f"Could not load analysis modules: {self.load_error}", fg="red")
+            self.status_label.config(text="Startup failed.", fg="red")
+            return
+        self.placeholder.destroy()
+        self.fig, self.ax = plt.subplots(figsize=(9, 3.4))
+        self.fig.patch.set_facecolor(BG_COLOR)
+        self.canvas = FigureCanvasTkAgg(self.fig, master=self.center)
+        self.canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        self.analysis_rate_menu.config(values=["Full"] + [str(r) for r in ANALYSIS_RATES])
+        self.open_btn.config(state=tk.NORMAL)
+        self.batch_btn.config(state=tk.NORMAL)
+        self.ready_time = time.perf_counter() - STARTUP_T0
+        timing = f"Startup: window {self.window_time:.2f} s, analysis ready {self.ready_time:.2f} s"
+        print(timing)
+        self.status_label.config(text=f"Ready. {timing}", fg="#14598d")
+        if self.exit_when_ready:
+            self.force_exit()
+
     def load_audio(self):
         file_path = filedialog.askopenfilename(filetypes=[("WAV files", "*.wav")])
         if file_path:
             self.audio_path = file_path
-            self.audio_data, self.sr = sf.read(file_path)
-            if self.audio_data.ndim > 1:
-                self.audio_data = np.mean(self.audio_data, axis=1)
+            # Samples stay on disk; playback and plotting read windows through the reader
+            if self.audio is not None:
+                self.audio.close()
+            self.audio = AudioReader(file_path)
+            self.sr = self.audio.sr
             # ---- LIMPA O ROI PATCH E REGIÃO ----
             if self.roi_patch:
                 try:
@@ -222,7 +312,7 @@ class CPPApp:
 
     def show_spectrogram(self):
         self.ax.clear()
-        plot_praat_spectrogram(self.ax, self.audio_path, max_freq=5000)
+        plot_praat_spectrogram(self.ax, self.audio, max_freq=5000, analysis_rate=self.get_analysis_rate())
         self.ax.set_facecolor(BG_COLOR)
         self.fig.patch.set_facecolor(BG_COLOR)
         self.canvas.draw()
@@ -240,7 +330,7 @@ class CPPApp:
         self.region = None
 
     def on_select(self, tmin, tmax):
-        duration = self.audio_data.shape[0] / self.sr
+        duration = self.audio.duration
         tmin = max(0, min(duration, tmin))
         tmax = max(0, min(duration, tmax))
         if tmax > tmin:
@@ -251,6 +341,16 @@ class CPPApp:
             self.status_label.config(text=f"Selected ROI: {tmin:.2f} - {tmax:.2f} s")
             self.canvas.draw()
 
+    def get_analysis_rate(self):
+        value = self.analysis_rate_var.get()
+        return None if value == "Full" else float(value)
+
+    def on_analysis_rate_change(self, event=None):
+        if self.audio is not None:
+            self.show_spectrogram()
+            self.status_label.config(text=f"Analysis rate: {self.analysis_rate_var.get()}. Select ROI again.",
+                                     fg="#14598d")
+
     def set_f0_range(self):
         minval = self.f0_min_var.get()
         maxval = self.f0_max_var.get()
@@ -284,7 +384,8 @@ class CPPApp:
                 self.audio_path, region=region, method=method, file_type=file_type,
                 min_f0=min_f0, max_f0=max_f0,
                 vad_enabled=self.vad_enabled.get(),
-                pause_removal_enabled=self.pause_removal_enabled.get()
+                pause_removal_enabled=self.pause_removal_enabled.get(),
+                analysis_rate=self.get_analysis_rate()
             )
             self.analysis_result = results
             self.results_type = file_type
@@ -336,7 +437,8 @@ class CPPApp:
                 folder_path, method=method, file_type=file_type,
                 min_f0=min_f0, max_f0=max_f0,
                 vad_enabled=self.vad_enabled.get(),
-                pause_removal_enabled=self.pause_removal_enabled.get()
+                pause_removal_enabled=self.pause_removal_enabled.get(),
+                analysis_rate=self.get_analysis_rate()
             )
         except Exception as e:
             messagebox.showerror("Batch Error", str(e))
@@ -355,6 +457,9 @@ class CPPApp:
                 base = os.path.splitext(r.get("filename", "unnamed"))[0]
                 save_path = os.path.join(plot_dir, f"{base}_{method}_quefrency.png")
                 plot_quefrency_figure(r, method, save_path=save_path, show=False)
+            # Only filename/cpp/region are needed for export: free the per-file arrays
+            for key in ("quefrency", "spectrum", "trend"):
+                r.pop(key, None)
 
     def export_csv(self):
         save_path = filedialog.asksaveasfilename(defaultextension=".csv", filetypes=[("CSV", "*.csv")])
@@ -363,6 +468,7 @@ class CPPApp:
         import csv
         f0_min = self.f0_min_var.get()
         f0_max = self.f0_max_var.get()
+        analysis_rate = self.analysis_rate_var.get()
         if self.analysis_result and not self.batch_results:
             region = self.region or (None, None)
             row = {
@@ -373,6 +479,7 @@ class CPPApp:
                 self.analysis_method: f"{self.analysis_result['cpp']:.3f}" if self.analysis_result else "",
                 "f0_min": f"{f0_min:.1f}",
                 "f0_max": f"{f0_max:.1f}",
+                "analysis_rate": analysis_rate,
             }
             with open(save_path, 'w', newline='') as f:
                 writer = csv.DictWriter(f, fieldnames=list(row.keys()))
@@ -385,7 +492,7 @@ class CPPApp:
                 writer = csv.writer(f)
                 writer.writerow([
                     "filename", "file_type", value_column,
-                    "roi_start", "roi_end", "f0_min", "f0_max"
+                    "roi_start", "roi_end", "f0_min", "f0_max", "analysis_rate"
                 ])
                 for r in self.batch_results:
                     region = r.get("region", (None, None))
@@ -396,7 +503,8 @@ class CPPApp:
                         f"{region[0]:.3f}" if region and region[0] is not None else "",
                         f"{region[1]:.3f}" if region and region[1] is not None else "",
                         f"{f0_min:.1f}",
-                        f"{f0_max:.1f}"
+                        f"{f0_max:.1f}",
+                        analysis_rate
                     ])
         self.status_label.config(text="Results exported.", fg="green")
 
@@ -434,7 +542,7 @@ class CPPApp:
         try:
             import sounddevice as sd
             sd.stop()
-            sd.play(self.audio_data, self.sr)
+            sd.play(self.audio.read(), self.sr)
         except Exception:
             messagebox.showinfo("Audio", "Install the package 'sounddevice' for playback (pip install sounddevice).")
 
@@ -458,4 +566,7 @@ class CPPApp:
 if __name__ == "__main__":
     root = tk.Tk()
     app = CPPApp(root)
+    root.update()  # paint the window before the heavy imports start
+    # `python main.py --startup-time` prints the startup timings and exits (for regression checks)
+    app.start_loading(exit_when_ready="--startup-time" in sys.argv)
     root.mainloop()
@@ -0,0 +1,289 @@
+# resampling.py
+"""
+Anti-aliased decimation to a configurable analysis sample rate, applied once per file
+before framing (CPP/CPPS and spectrogram paths), plus a validation report comparing
+CPP/CPPS at each candidate rate against full-rate analysis, through the engine the
+analysis itself will use (Praat's extract_cpp when Praat is available).
+
+Run as a script to produce the report for a folder of WAV files:
+    python resampling.py <folder> --rates 22050 16000 11025 --method CPPS --praat-path praat --out report.csv
+"""
+import argparse
+import functools
+import os
+import shutil
+import time
+from fractions import Fraction
+
+import numpy as np
+from scipy.signal import firwin, resample_poly
+
+from audio_io import AudioReader
+from file_utils import get_wav_files_in_folder, save_decimation_report
+
+# Suggested choices. All stay above 2 * MAX_FREQ (10 kHz) with enough margin for the
+# filter's roll-off (see below) to leave the analysed 0-5 kHz band untouched; at 10 kHz
+# its top would be attenuated by up to 6 dB.
+ANALYSIS_RATES = [22050, 16000, 11025]
+# Anti-aliasing filter: half length in units of max(up, down) and Kaiser beta. Flat to
+# 0.1 dB up to 93 % of the new Nyquist, -6 dB at it, about -100 dB from 110 % on
+# (scipy's default, 10 and 5.0, is still at -23 dB at 110 %).
+FILTER_HALF_LENGTH = 32
+FILTER_BETA = 10.0
+
+
+def decimation_factors(analysis_rate, sr):
+    """Rational (up, down) factors taking `sr` to `analysis_rate`."""
+    ratio = Fraction(int(round(analysis_rate)), int(round(sr))).limit_denominator(1000)
+    return ratio.numerator, ratio.denominator
+
+
+@functools.lru_cache(maxsize=16)
+def decimation_filter(up, down):
+    """
+    Kaiser-windowed sinc low-pass at the lower of the two Nyquist rates, for resample_poly.
+    Cached (corpora mostly share a few rates); callers must not modify the array.
+    """
+    max_rate = max(up, down)
+    return firwin(2 * FILTER_HALF_LENGTH * max_rate + 1, 1.0 / max_rate, window=('kaiser', FILTER_BETA))
+
+
+def resample_to_rate(samples, sr, analysis_rate=None, axis=-1):
+    """
+    Decimate `samples` to `analysis_rate` with a polyphase anti-aliasing filter.
+    Signals already at or below the target are returned unchanged (never upsampled).
+    Returns (samples, sr); the new rate is exact for the rational up/down factors used.
+    """
+    if not analysis_rate or analysis_rate >= sr:
+        return samples, sr
+    up, down = decimation_factors(analysis_rate, sr)
+    dtype = samples.dtype if samples.dtype.kind == 'f' else np.float32
+    y = resample_poly(samples, up, down, axis=axis, window=decimation_filter(up, down))
+    return y.astype(dtype, copy=False), sr * up / down
+
+
+class StreamResampler:
+    """
+    resample_to_rate() for audio arriving in chunks. Output sample m is the one
+    resample_to_rate() gives for the whole signal, emitted as soon as the filter has
+    seen all its inputs, i.e. `delay` seconds after the input sample at the same time.
+    Only the end of the signal differs (the filter is never flushed with zeros).
+
+    Buffers are allocated once, for chunks of up to `max_chunk` samples (grown if a
+    larger one arrives): push() copies the chunk after the filter history and computes
+    `BLOCK_OUTPUTS` outputs at a time into scratch space, so it allocates nothing.
+    """
+
+    BLOCK_OUTPUTS = 256
+
+    def __init__(self, sr, analysis_rate, max_chunk=None):
+        self.sr = sr
+        max_chunk = max_chunk or int(sr)
+        if not analysis_rate or analysis_rate >= sr:
+            self.up = self.down = 1
+            self.rate = sr
+            self._bank = None
+            self.delay = 0.0
+            self._out = np.empty(max_chunk, dtype=np.float32)
+            return
+        self.up, self.down = decimation_factors(analysis_rate, sr)
+        self.rate = sr * self.up / self.down
+        h = decimation_filter(self.up, self.down) * self.up
+        self._half = (len(h) - 1) // 2
+        # Polyphase bank: output m = dot(bank[phase(m)], the n_taps inputs ending at last(m))
+        self._taps = -(-len(h) // self.up)
+        h = np.concatenate((h, np.zeros(self._taps * self.up - len(h))))
+        self._bank = np.ascontiguousarray(h.reshape(self._taps, self.up).T[:, ::-1])
+        self.delay = self._half / self.up / sr
+
+        block = self.BLOCK_OUTPUTS
+        self._steps = np.arange(block, dtype=np.int64)
+        self._centre = np.empty(block, dtype=np.int64)
+        self._last = np.empty(block, dtype=np.int64)
+        self._phase = np.empty(block, dtype=np.int64)
+        self._tap_offsets = np.tile(np.arange(self._taps, dtype=np.int64), (block, 1))
+        self._indices = np.empty((block, self._taps), dtype=np.int64)
+        self._bank_rows = np.empty((block, self._taps))
+        self._windows = np.empty((block, self._taps))
+        self._acc = np.empty(block)
+        self._bufs = None
+        self._reserve(max_chunk)
+        self.reset()
+
+    def _reserve(self, chunk_size):
+        """Size the input and output buffers for chunks of up to `chunk_size` samples."""
+        if self._bank is None:
+            if chunk_size > len(self._out):
+                self._out = np.empty(chunk_size, dtype=np.float32)
+            return
+        history = self._taps - 1
+        if self._bufs is not None and chunk_size <= len(self._bufs[0]) - history:
+            return
+        # Two input buffers: after each push the history moves to the front of the other one
+        bufs = [np.zeros(history + chunk_size) for _ in range(2)]
+        if self._bufs is not None:
+            bufs[0][:history] = self._bufs[self._flip][:history]
+        self._bufs, self._flip = bufs, 0
+        self._out = np.empty(-(-chunk_size * self.up // self.down) + 1, dtype=np.float32)
+
+    def reset(self):
+        if self._bank is None:
+            return
+        self._bufs[self._flip][:self._taps - 1] = 0
+        self._seen = 0
+        self._next = 0
+
+    def push(self, samples):
+        """
+        Feed a chunk of samples; returns the output samples it completes (float32), a
+        view into an internal buffer valid until the next push().
+        """
+        n = len(samples)
+        self._reserve(n)
+        if self._bank is None:
+            if getattr(samples, "dtype", None) == np.float32:
+                return samples
+            self._out[:n] = samples
+            return self._out[:n]
+        if n == 0:
+            return self._out[:0]
+        history = self._taps - 1
+        buf = self._bufs[self._flip]
+        buf[history:history + n] = samples
+        buf_start = self._seen - history
+        self._seen += n
+        # Output m needs inputs up to (m * down + half) // up
+        end = max(self._next, -(-(self._seen * self.up - self._half) // self.down))
+        for first in range(self._next, end, self.BLOCK_OUTPUTS):
+            b = min(self.BLOCK_OUTPUTS, end - first)
+            centre, last, phase = self._centre[:b], self._last[:b], self._phase[:b]
+            np.add(self._steps[:b], first, out=centre)
+            centre *= self.down
+            centre += self._half
+            np.floor_divide(centre, self.up, out=last)
+            np.multiply(last, self.up, out=phase)
+            np.subtract(centre, phase, out=phase)
+            # Buffer index of the first of the n_taps inputs of each output
+            last -= history + buf_start
+            # (broadcasting inside a ufunc would allocate iterator buffers; copyto does not)
+            np.copyto(self._indices[:b], np.broadcast_to(last[:, None], (b, self._taps)))
+            self._indices[:b] += self._tap_offsets[:b]
+            np.take(self._bank, phase, axis=0, out=self._bank_rows[:b], mode='clip')
+            np.take(buf, self._indices[:b], out=self._windows[:b], mode='clip')
+            np.einsum('ij,ij->i', self._bank_rows[:b], self._windows[:b], out=self._acc[:b])
+            self._out[first - self._next:first - self._next + b] = self._acc[:b]
+        n_out = end - self._next
+        self._next = end
+        # Keep the last taps - 1 inputs as the history in front of the other buffer
+        self._flip ^= 1
+        self._bufs[self._flip][:history] = buf[n:n + history]
+        return self._out[:n_out]
+
+
+def praat_available(praat_path):
+    return shutil.which(praat_path) is not None or os.path.isfile(praat_path)
+
+
+def _measure(path, rate, engine, method, min_f0, max_f0, praat_path):
+    """CPP/CPPS of `path` decimated to `rate` (None: full rate) and the rate analysed."""
+    if engine == "praat":
+        from cpp_analysis import extract_cpp
+        with AudioReader(path) as audio:
+            sr = audio.sr
+        value = extract_cpp(path, region=None, method=method, praat_path=praat_path, min_f0=min_f0,
+                            max_f0=max_f0, analysis_rate=rate)["cpp"]
+        if value is None:
+            raise ValueError("Praat returned no value.")
+        if rate and rate < sr:
+            up, down = decimation_factors(rate, sr)
+            sr = sr * up / down
+        return value, sr
+    from cepstrum import analyze_signal, to_analysis_rate
+    with AudioReader(path) as audio:
+        samples, sr = to_analysis_rate(audio.read(), audio.sr, rate)
+    return float(analyze_signal(samples, sr, method, min_f0, max_f0)["cpp"]), sr
+
+
+def decimation_report(paths, rates=ANALYSIS_RATES, method="CPPS", min_f0=60, max_f0=330, engine="praat",
+                      praat_path="praat.exe"):
+    """
+    CPP/CPPS of each file at full rate and at each analysis rate, through the same engine
+    as the analysis: "praat" (extract_cpp, which the GUI's analysis rate setting
+    changes) or "numpy" (cepstrum.py, which decimates to 2 * MAX_FREQ itself, so
+    rates above that leave its values unchanged).
+    Returns (rows, summary): one row per file and rate with the deviation from full
+    rate (or the error that rate raised), and per-rate mean/max absolute deviation,
+    mean speed-up and error count.
+    """
+    rows = []
+    for path in paths:
+        with AudioReader(path) as audio:
+            source_rate = audio.sr
+        t0 = time.perf_counter()
+        try:
+            full, _ = _measure(path, None, engine, method, min_f0, max_f0, praat_path)
+        except Exception as e:
+            print(f"Skipping {os.path.basename(path)}: {e}")
+            continue
+        full_time = time.perf_counter() - t0
+        for rate in rates:
+            row = {"filename": os.path.basename(path), "engine": engine, "source_rate": source_rate,
+                   "target_rate": rate, "cpp_full": full}
+            t0 = time.perf_counter()
+            try:
+                val, analysed_rate = _measure(path, rate, engine, method, min_f0, max_f0, praat_path)
+            except Exception as e:
+                print(f"{os.path.basename(path)} at {rate:g} Hz: {e}")
+                row["error"] = f"{type(e).__name__}: {e}"
+                rows.append(row)
+                continue
+            elapsed = time.perf_counter() - t0
+            row.update(analysis_rate=analysed_rate, cpp=val, deviation=val - full,
+                       speedup=full_time / elapsed if elapsed > 0 else float("nan"))
+            rows.append(row)
+
+    summary = []
+    for rate in rates:
+        sel = [r for r in rows if r["target_rate"] == rate]
+        ok = [r for r in sel if "error" not in r]
+        if not sel:
+            continue
+        dev = np.abs([r["deviation"] for r in ok]) if ok else np.array([np.nan])
+        summary.append({
+            "analysis_rate": rate,
+            "files": len(ok),
+            "errors": len(sel) - len(ok),
+            "mean_abs_deviation": float(dev.mean()),
+            "max_abs_deviation": float(dev.max()),
+            "mean_speedup": float(np.mean([r["speedup"] for r in ok])) if ok else float("nan"),
+        })
+    return rows, summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CPP/CPPS deviation of decimated vs full-rate analysis.")
+    parser.add_argument("folder")
+    parser.add_argument("--rates", type=float, nargs="+", default=ANALYSIS_RATES)
+    parser.add_argument("--method", default="CPPS", choices=["CPP", "CPPS"])
+    parser.add_argument("--min-f0", type=float, default=60)
+    parser.add_argument("--max-f0", type=float, default=330)
+    parser.add_argument("--engine", choices=["auto", "praat", "numpy"], default="auto",
+                        help="auto: Praat if found at --praat-path, else the NumPy engine")
+    parser.add_argument("--praat-path", default="praat.exe")
+    parser.add_argument("--out", default=None, help="CSV file for the per-file rows")
+    args = parser.parse_args()
+
+    engine = args.engine
+    if engine == "auto":
+        engine = "praat" if praat_available(args.praat_path) else "numpy"
+        print(f"Engine: {engine}" + ("" if engine == "praat" else f" (Praat not found at {args.praat_path})"))
+    elif engine == "praat" and not praat_available(args.praat_path):
+        parser.error(f"Praat not found at {args.praat_path}; set --praat-path or use --engine numpy.")
+    rows, summary = decimation_report(get_wav_files_in_folder(args.folder), args.rates,
+                                      args.method, args.min_f0, args.max_f0, engine, args.praat_path)
+    if args.out:
+        save_decimation_report(rows, args.out)
+    print(f"{'rate (Hz)':>10} {'files':>6} {'errors':>6} {'mean |dev| dB':>14} {'max |dev| dB':>13} {'speed-up':>9}")
+    for s in summary:
+        print(f"{s['analysis_rate']:>10.0f} {s['files']:>6} {s['errors']:>6} {s['mean_abs_deviation']:>14.3f} "
+              f"{s['max_abs_deviation']:>13.3f} {s['mean_speedup']:>8.1f}x")
@@ -0,0 +1,484 @@
+# service.py
+"""
+Local CPP/CPPS analysis service (HTTP over asyncio, standard library only).
+
+A pool of worker processes is started once with the analysis modules imported and
+warmed up, so a request pays only for decoding and analysis. Concurrent requests are
+micro-batched (up to `max_batch` jobs, waiting at most `batch_wait` seconds); the batch
+is split over the workers idle at that moment, each worker gets its share in one call
+and analyses the NumPy-engine jobs at the same analysis rate in one packed pass
+(batch_cepstrum.analyze_packed). If a worker process dies, the pool is recreated and
+the share it was running is retried once.
+
+Endpoints:
+    POST /analyze   JSON {"path": ..., "method": "CPPS", "min_f0": 60, "max_f0": 330,
+                    "region": [start, end], "analysis_rate": 16000}
+                    or raw audio bytes (WAV/FLAC/OGG) with the same options in the query string.
+    GET  /health    pool state, worker count, queue depth (503 while the pool is down)
+    GET  /metrics   request counters, batch sizes and latencies
+
+Responses are JSON with the result and per-stage timings (queue, decode, resample,
+analysis, total, in seconds); NumPy-engine results also give the number of jobs in
+their packed pass (packed_jobs). Invalid requests and audio answer 400, failures of the
+service itself 500. A full queue answers 503 (backpressure), a request not answered
+within `timeout` seconds answers 504.
+
+    python service.py --port 8765 --workers 2
+"""
+import argparse
+import asyncio
+import io
+import json
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs, urlsplit
+
+MAX_BODY = 200 * 1024 * 1024
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           408: "Request Timeout", 413: "Payload Too Large", 500: "Internal Server Error", 503: "Service Unavailable",
+           504: "Gateway Timeout"}
+JOB_OPTIONS = {"method": str, "min_f0": float, "max_f0": float, "analysis_rate": float, "engine": str}
+
+
+# ---------------------------------------------------------------- worker side
+
+def _warm_worker(engine):
+    """Process-pool initializer: import the analysis stack and run it once."""
+    import numpy as np
+    from batch_cepstrum import analyze_packed
+    import audio_io  # noqa: F401
+    import resampling  # noqa: F401
+    if engine == "praat":
+        import cpp_analysis  # noqa: F401
+    analyze_packed([np.zeros(8000, dtype=np.float32)], 8000)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _praat_job(job):
+    from cpp_analysis import extract_cpp
+
+    t0 = time.perf_counter()
+    method = job.get("method", "CPPS")
+    path, tmp = job.get("path"), None
+    if path is None:
+        fd, tmp = tempfile.mkstemp(suffix=".wav")
+        with os.fdopen(fd, "wb") as f:
+            f.write(job["data"])
+        path = tmp
+    try:
+        res = extract_cpp(path, region=job.get("region"), method=method, min_f0=job.get("min_f0", 60),
+                          max_f0=job.get("max_f0", 330), praat_path=job.get("praat_path", "praat.exe"),
+                          analysis_rate=job.get("analysis_rate"))
+    finally:
+        if tmp is not None:
+            os.remove(tmp)
+    return {"cpp": res["cpp"], "method": method, "region": list(res["region"]),
+            "timings": {"analysis": time.perf_counter() - t0}}
+
+
+def _decode_job(job):
+    """Read and decimate a NumPy-engine job's audio. Returns its result dict, with the
+    samples under "samples" until they are analysed."""
+    import numpy as np
+    import soundfile as sf
+    from audio_io import AudioReader
+    from cepstrum import to_analysis_rate
+
+    timings = {}
+    region = job.get("region")
+    t0 = time.perf_counter()
+    if "path" in job:
+        with AudioReader(job["path"]) as audio:
+            sr, duration = audio.sr, audio.duration
+            start, end = region if region else (0, duration)
+            samples = audio.read_time(max(0, start), min(duration, end))
+    else:
+        data, sr = sf.read(io.BytesIO(job["data"]), dtype="float32", always_2d=True)
+        samples = data.mean(axis=1, dtype=np.float32)
+        duration = len(samples) / sr
+        start, end = region if region else (0, duration)
+        samples = samples[int(max(0, start) * sr):int(min(duration, end) * sr)]
+    t1 = time.perf_counter()
+    timings["decode"] = t1 - t0
+
+    samples, rate = to_analysis_rate(samples, sr, job.get("analysis_rate"))
+    timings["resample"] = time.perf_counter() - t1
+    return {
+        "samples": samples,
+        "method": job.get("method", "CPPS"),
+        "region": [max(0, start), min(duration, end)],
+        "sampling_rate": sr,
+        "analysis_rate": rate,
+        "timings": timings,
+    }
+
+
+def _job_error(e):
+    """Error result with the HTTP status it maps to: 400 for unreadable or unsuitable
+    input, 500 for anything else."""
+    import soundfile as sf
+    status = 400 if isinstance(e, (ValueError, OSError, sf.SoundFileError)) else 500
+    return {"error": f"{type(e).__name__}: {e}", "status": status}
+
+
+def _run_jobs(jobs):
+    """
+    Run one runner's share of a micro-batch inside a worker; returns one result dict per
+    job. NumPy-engine jobs with the same analysis rate and settings are analysed in one
+    packed pass (batch_cepstrum.analyze_packed), Praat jobs one at a time.
+    """
+    from batch_cepstrum import analyze_packed
+    from cepstrum import PITCH_FLOOR
+
+    results = [None] * len(jobs)
+    packs = {}  # (rate, method, min_f0, max_f0) -> [(index, decoded job)]
+    for i, job in enumerate(jobs):
+        try:
+            if job.get("engine") == "praat":
+                results[i] = _praat_job(job)
+                continue
+            res = _decode_job(job)
+        except Exception as e:
+            results[i] = _job_error(e)
+            continue
+        key = (res["analysis_rate"], res["method"].upper(), job.get("min_f0", 60), job.get("max_f0", 330))
+        packs.setdefault(key, []).append((i, res))
+
+    for (rate, method, min_f0, max_f0), members in packs.items():
+        t0 = time.perf_counter()
+        try:
+            values, counts = analyze_packed([res.pop("samples") for _, res in members], rate, method,
+                                            min_f0, max_f0)
+        except Exception as e:
+            for i, _ in members:
+                results[i] = _job_error(e)
+            continue
+        elapsed = time.perf_counter() - t0
+        for (i, res), value, n in zip(members, values, counts):
+            if n == 0:
+                results[i] = _job_error(ValueError("Signal is shorter than one analysis window "
+                                                   f"({2 * 3.0 / PITCH_FLOOR:.3f} s)."))
+                continue
+            res.update(cpp=float(value), frames=int(n), packed_jobs=len(members))
+            res["timings"]["analysis"] = elapsed
+            results[i] = res
+    return results
+
+
+# ---------------------------------------------------------------- server side
+
+class AnalysisService:
+    def __init__(self, host="127.0.0.1", port=8765, workers=2, max_batch=8, batch_wait=0.005,
+                 queue_size=64, timeout=30.0, engine="praat", praat_path="praat.exe"):
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.timeout = timeout
+        self.engine = engine
+        self.praat_path = praat_path
+        self.queue_size = queue_size
+        self.queue = None
+        self.pool = None
+        self.pool_state = "stopped"
+        self._pool_lock = None
+        self.server = None
+        self._batcher = None
+        self._slots = None
+        self._in_flight = 0
+        self.started = None
+        self.metrics = {"requests": 0, "completed": 0, "errors": 0, "rejected": 0, "timeouts": 0,
+                        "batches": 0, "batched_jobs": 0, "pool_restarts": 0, "latency_total": 0.0,
+                        "latency_max": 0.0}
+
+    async def start(self):
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        self._slots = asyncio.Semaphore(self.workers)
+        self._pool_lock = asyncio.Lock()
+        await self._start_pool()
+        self._batcher = asyncio.create_task(self._batch_loop())
+        self.server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.started = time.time()
+
+    async def stop(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        if self._batcher is not None:
+            self._batcher.cancel()
+        if self.pool is not None:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+        self.pool_state = "stopped"
+
+    async def _start_pool(self):
+        """Create the process pool and spawn and warm every worker before it takes jobs."""
+        loop = asyncio.get_running_loop()
+        self.pool_state = "starting"
+        # Never fork the server itself: a forked worker would inherit, and keep open, the
+        # sockets of the connections open at that moment (the pool is recreated while serving)
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=context,
+                                        initializer=_warm_worker, initargs=(self.engine,))
+        await asyncio.gather(*(loop.run_in_executor(self.pool, _ping) for _ in range(self.workers)))
+        self.pool_state = "ok"
+
+    async def _restart_pool(self, broken):
+        """Replace `broken` (a pool whose worker died) unless another runner already has."""
+        async with self._pool_lock:
+            if self.pool is not broken:
+                return
+            self.metrics["pool_restarts"] += 1
+            broken.shutdown(wait=False, cancel_futures=True)
+            try:
+                await self._start_pool()
+            except Exception:  # e.g. the initializer fails again; the next job or health check retries
+                self.pool_state = "broken"
+
+    def _pool_broken(self):
+        # The executor marks itself broken as soon as it notices a dead worker
+        return self.pool_state == "broken" or bool(getattr(self.pool, "_broken", False))
+
+    async def serve_forever(self):
+        await self.start()
+        print(f"CepstralVox service on http://{self.host}:{self.port} ({self.workers} workers, {self.engine})")
+        async with self.server:
+            await self.server.serve_forever()
+
+    # ---- batching
+
+    async def _batch_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.batch_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self.queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            # Wait for a free worker, then enlist every other idle one (up to one per job);
+            # meanwhile new requests pile up into the next batch
+            await self._slots.acquire()
+            batch = [item for item in batch if not item[1].done()]  # drop timed-out requests
+            if not batch:
+                self._slots.release()
+                continue
+            self.metrics["batches"] += 1
+            self.metrics["batched_jobs"] += len(batch)
+            runners = 1
+            while runners < len(batch) and not self._slots.locked():
+                await self._slots.acquire()
+                runners += 1
+            for i in range(runners):
+                asyncio.create_task(self._dispatch(batch[i::runners]))
+
+    async def _dispatch(self, share):
+        """Run `share` (this runner's part of a micro-batch) on one worker in one call."""
+        loop = asyncio.get_running_loop()
+        self._in_flight += 1
+        try:
+            jobs = [job for job, _, _ in share]
+            for _ in range(2):
+                pool = self.pool
+                try:
+                    results = await loop.run_in_executor(pool, _run_jobs, jobs)
+                    break
+                except BrokenProcessPool as e:
+                    # A worker died (possibly on another share): recreate the pool, retry once
+                    results = [{"error": f"{type(e).__name__}: {e}", "status": 500}] * len(jobs)
+                    await self._restart_pool(pool)
+                except Exception as e:
+                    results = [{"error": f"{type(e).__name__}: {e}", "status": 500}] * len(jobs)
+                    break
+            for (_, future, queued), res in zip(share, results):
+                if not future.done():
+                    future.set_result((res, queued))
+        finally:
+            self._in_flight -= 1
+            self._slots.release()
+
+    async def submit(self, job):
+        """Queue one job and wait for its result dict (raises QueueFull / TimeoutError)."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queued = time.perf_counter()
+        self.queue.put_nowait((job, future, queued))
+        res, _ = await asyncio.wait_for(future, self.timeout)
+        res = dict(res)
+        timings = dict(res.get("timings", {}))
+        timings["queue"] = time.perf_counter() - queued - sum(timings.values())
+        res["timings"] = timings
+        return res
+
+    # ---- HTTP
+
+    async def _handle(self, reader, writer):
+        t0 = time.perf_counter()
+        try:
+            status, payload = await self._route(reader)
+        except Exception as e:
+            status, payload = 500, {"error": f"{type(e).__name__}: {e}"}
+        if "timings" in payload:
+            payload["timings"]["total"] = time.perf_counter() - t0
+        body = json.dumps(payload).encode()
+        head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+                "Content-Type: application/json\r\n"
+                f"Content-Length: {len(body)}\r\n"
+                "Connection: close\r\n")
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        try:
+            writer.write(head.encode() + b"\r\n" + body)
+            await writer.drain()
+        finally:
+            writer.close()
+
+    async def _route(self, reader):
+        request_line = (await reader.readline()).decode("latin-1").split()
+        if len(request_line) < 2:
+            return 400, {"error": "Malformed request line."}
+        verb, target = request_line[0].upper(), request_line[1]
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            key, _, value = line.decode("latin-1").partition(":")
+            headers[key.strip().lower()] = value.strip()
+        url = urlsplit(target)
+
+        if url.path == "/health":
+            state = "broken" if self._pool_broken() else self.pool_state
+            if state == "broken" and not self._pool_lock.locked():
+                asyncio.create_task(self._restart_pool(self.pool))
+            return (200 if state == "ok" else 503), {
+                "status": state, "workers": self.workers, "engine": self.engine,
+                "queue": self.queue.qsize(), "queue_size": self.queue.maxsize,
+                "uptime": time.time() - self.started}
+        if url.path == "/metrics":
+            return 200, self._metrics()
+        if url.path != "/analyze":
+            return 404, {"error": f"Unknown endpoint {url.path}"}
+        if verb != "POST":
+            return 405, {"error": "Use POST /analyze."}
+
+        raw_length = headers.get("content-length", "0")
+        if not raw_length.isdigit():
+            return 400, {"error": f"Invalid Content-Length: {raw_length!r}."}
+        length = int(raw_length)
+        if length > MAX_BODY:
+            return 413, {"error": f"Body larger than {MAX_BODY} bytes."}
+        try:
+            body = await asyncio.wait_for(reader.readexactly(length), self.timeout) if length else b""
+        except asyncio.IncompleteReadError:
+            return 400, {"error": f"Body shorter than its Content-Length ({length} bytes)."}
+        except asyncio.TimeoutError:
+            return 408, {"error": f"Body not received within {self.timeout} s."}
+        try:
+            job = self._parse_job(headers.get("content-type", ""), body, parse_qs(url.query))
+        except (ValueError, KeyError, TypeError) as e:
+            return 400, {"error": str(e)}
+
+        self.metrics["requests"] += 1
+        start = time.perf_counter()
+        try:
+            res = await self.submit(job)
+        except asyncio.QueueFull:
+            self.metrics["rejected"] += 1
+            return 503, {"error": "Analysis queue is full, retry later."}
+        except asyncio.TimeoutError:
+            self.metrics["timeouts"] += 1
+            return 504, {"error": f"Analysis did not finish within {self.timeout} s."}
+        latency = time.perf_counter() - start
+        self.metrics["latency_total"] += latency
+        self.metrics["latency_max"] = max(self.metrics["latency_max"], latency)
+        if "error" in res:
+            self.metrics["errors"] += 1
+            return res.pop("status", 500), res
+        self.metrics["completed"] += 1
+        return 200, res
+
+    def _parse_job(self, content_type, body, query):
+        if content_type.startswith("application/json"):
+            options = json.loads(body or b"{}")
+            if "path" not in options:
+                raise ValueError("JSON requests need a 'path'; upload audio bytes otherwise.")
+            job = {"path": str(options["path"])}
+        else:
+            if not body:
+                raise ValueError("Empty request: send JSON with a 'path' or audio bytes.")
+            options = {k: v[0] for k, v in query.items()}
+            if "region" in options:
+                options["region"] = options["region"].split(",")
+            job = {"data": body}
+        for key, cast in JOB_OPTIONS.items():
+            if options.get(key) is not None:
+                job[key] = cast(options[key])
+        if job.get("method", "CPPS").upper() not in ("CPP", "CPPS"):
+            raise ValueError("method must be CPP or CPPS.")
+        if job.get("engine", self.engine) not in ("numpy", "praat"):
+            raise ValueError("engine must be numpy or praat.")
+        min_f0, max_f0 = job.get("min_f0", 60), job.get("max_f0", 330)
+        if not (math.isfinite(min_f0) and math.isfinite(max_f0) and 0 < min_f0 < max_f0):
+            raise ValueError(f"Need 0 < min_f0 < max_f0 (finite), got min_f0={min_f0}, max_f0={max_f0}.")
+        if "analysis_rate" in job and not (math.isfinite(job["analysis_rate"]) and job["analysis_rate"] > 0):
+            raise ValueError(f"analysis_rate must be a positive number of Hz, got {job['analysis_rate']}.")
+        if options.get("region"):
+            start, end = (float(v) for v in options["region"])
+            if not (math.isfinite(start) and math.isfinite(end) and start < end):
+                raise ValueError(f"region must be [start, end] in seconds with start < end, got {[start, end]}.")
+            job["region"] = (start, end)
+        job.setdefault("engine", self.engine)
+        job["praat_path"] = self.praat_path
+        return job
+
+    def _metrics(self):
+        m = dict(self.metrics)
+        answered = m["completed"] + m["errors"]
+        m["latency_mean"] = m.pop("latency_total") / answered if answered else 0.0
+        m["mean_batch_size"] = m["batched_jobs"] / m["batches"] if m["batches"] else 0.0
+        m["queue"] = self.queue.qsize()
+        m["busy_workers"] = self._in_flight
+        return m
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local CPP/CPPS analysis service.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=max(1, (os.cpu_count() or 2) - 1))
+    parser.add_argument("--max-batch", type=int, default=8)
+    parser.add_argument("--batch-wait", type=float, default=0.005, help="seconds to wait to fill a batch")
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--engine", choices=["numpy", "praat"], default="praat",
+                        help="numpy: faster, but its deviation from Praat is not yet measured")
+    parser.add_argument("--praat-path", default="praat.exe")
+    args = parser.parse_args()
+
+    async def main():
+        service = AnalysisService(args.host, args.port, args.workers, args.max_batch, args.batch_wait,
+                                  args.queue_size, args.timeout, args.engine, args.praat_path)
+        try:
+            await service.serve_forever()
+        finally:
+            await service.stop()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
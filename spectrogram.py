@@ -5,13 +5,30 @@ import matplotlib.pyplot as plt
 import parselmouth
 from parselmouth import SpectralAnalysisWindowShape
 
-def plot_praat_spectrogram(ax, file_path, max_freq=5000, fmin=50, fmax=1500):
+from audio_io import AudioReader
+from resampling import resample_to_rate
+
+def load_mono_sound(audio, analysis_rate=None):
+    """
+    Build a mono parselmouth.Sound from a path or an AudioReader, decimated to
+    `analysis_rate` if given. Only the downmixed channel is materialised.
+    """
+    if isinstance(audio, AudioReader):
+        samples, sr = audio.read(), audio.sr
+    else:
+        with AudioReader(audio) as reader:
+            samples, sr = reader.read(), reader.sr
+    samples, sr = resample_to_rate(samples, sr, analysis_rate)
+    return parselmouth.Sound(samples.astype(np.float64), sampling_frequency=sr)
+
+def plot_praat_spectrogram(ax, audio, max_freq=5000, fmin=50, fmax=1500, analysis_rate=None):
     """
     Plots a Praat-style spectrogram with the pitch curve (from Praat) always overlaid.
+    `audio` is a file path or an AudioReader.
     """
     ax.clear()
     ax.set_facecolor("white")
-    snd = parselmouth.Sound(file_path)
+    snd = load_mono_sound(audio, analysis_rate)
     spec = snd.to_spectrogram(
         window_length=0.03,
         maximum_frequency=max_freq,
@@ -0,0 +1,87 @@
+import math
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from aggregate import (PERCENTILES, SKETCH_BIN_WIDTH, GroupedStats, QuantileSketch, RunningStats,
+                       aggregate_extract_cpp)
+from cepstrum import synthetic_vowel
+
+
+def by_key(key):
+    return key
+
+
+@pytest.fixture(scope="module")
+def values():
+    rng = np.random.default_rng(0)
+    x = rng.normal(12.0, 3.0, 10000)
+    keys = np.where(rng.random(len(x)) < 0.3, "a", "b")
+    return x, keys
+
+
+def test_merged_partial_aggregates_match_numpy(values):
+    x, keys = values
+    rng = np.random.default_rng(1)
+    parts = [GroupedStats(by_key) for _ in range(7)]
+    for i in rng.permutation(len(x)):
+        parts[i % len(parts)].add(keys[i], float(x[i]))
+    merged = GroupedStats(by_key)
+    for part in parts:
+        merged.merge(part)
+
+    for row in merged.summary():
+        group = x[keys == row["group"]]
+        assert (row["n"], row["min"], row["max"]) == (len(group), group.min(), group.max())
+        assert row["mean"] == pytest.approx(group.mean(), abs=1e-9)
+        assert row["sd"] == pytest.approx(group.std(ddof=1), abs=1e-9)
+        for p in PERCENTILES:
+            # Nearest rank (the ceil(q * n)-th smallest value), to within half a bin
+            expected = np.percentile(group, p, method="inverted_cdf")
+            assert abs(row[f"p{p}"] - expected) <= SKETCH_BIN_WIDTH / 2 + 1e-12
+
+
+def test_merge_is_exact(values):
+    x, _ = values
+    whole, halves = QuantileSketch(), [QuantileSketch(), QuantileSketch()]
+    stats, stat_halves = RunningStats(), [RunningStats(), RunningStats()]
+    for i, v in enumerate(x):
+        whole.add(v)
+        halves[i % 2].add(v)
+        stats.add(v)
+        stat_halves[i % 2].add(v)
+    merged = halves[0].merge(halves[1])
+    assert (merged.n, merged.counts) == (whole.n, whole.counts)
+    merged_stats = stat_halves[0].merge(stat_halves[1])
+    assert merged_stats.mean == pytest.approx(stats.mean, abs=1e-12)
+    assert merged_stats.variance == pytest.approx(stats.variance, rel=1e-12)
+
+
+@pytest.mark.parametrize("q, expected", [(0.0, 1), (0.2, 1), (0.21, 2), (0.5, 3), (0.8, 4), (0.81, 5), (1.0, 5)])
+def test_quantile_is_nearest_rank(q, expected):
+    sketch = QuantileSketch(bin_width=1.0)
+    for v in (1, 2, 3, 4, 5):
+        sketch.add(v)
+    assert sketch.quantile(q) == expected + 0.5
+
+
+def test_empty_and_mismatched_sketches():
+    assert math.isnan(QuantileSketch().quantile(0.5))
+    with pytest.raises(ValueError):
+        QuantileSketch(0.01).merge(QuantileSketch(0.1))
+
+
+def test_corpus_is_grouped_by_folder_in_parallel(tmp_path):
+    for group, f0s in (("pre", (110, 130)), ("post", (150, 170, 190))):
+        (tmp_path / group).mkdir()
+        for f0 in f0s:
+            sf.write(tmp_path / group / f"{f0}.wav", synthetic_vowel(16000, f0=f0, duration=0.5), 16000,
+                     subtype="FLOAT")
+    sf.write(tmp_path / "post" / "short.wav", np.zeros(100, dtype=np.float32), 16000)
+
+    serial = aggregate_extract_cpp(str(tmp_path), engine="numpy").summary()
+    parallel = aggregate_extract_cpp(str(tmp_path), engine="numpy", workers=2).summary()
+    assert [(r["group"], r["n"], r["errors"]) for r in serial] == [("post", 3, 1), ("pre", 2, 0)]
+    for a, b in zip(serial, parallel):
+        assert a["mean"] == pytest.approx(b["mean"], abs=1e-9)
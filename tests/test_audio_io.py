@@ -0,0 +1,88 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from audio_io import AudioReader, parse_wav_layout
+
+SR = 16000
+
+
+@pytest.fixture(scope="module")
+def signal():
+    """Three channels of distinct, full-scale-safe content."""
+    rng = np.random.default_rng(0)
+    return (0.5 * rng.uniform(-1, 1, (SR // 2, 3))).astype(np.float32)
+
+
+def write(tmp_path, data, subtype, fmt="WAV", name=None):
+    path = tmp_path / (name or f"{subtype}.{fmt.lower()}")
+    sf.write(path, data, SR, subtype=subtype, format=fmt)
+    return str(path)
+
+
+@pytest.mark.parametrize("subtype, fmt, mapped", [
+    ("PCM_U8", "WAV", True),
+    ("PCM_16", "WAV", True),
+    ("PCM_32", "WAV", True),
+    ("FLOAT", "WAV", True),
+    ("DOUBLE", "WAV", True),
+    ("PCM_16", "WAVEX", True),  # WAVE_FORMAT_EXTENSIBLE: format tag in the sub-format GUID
+    ("PCM_24", "WAV", False),
+    ("PCM_16", "FLAC", False),
+])
+def test_samples_match_soundfile(tmp_path, signal, subtype, fmt, mapped):
+    path = write(tmp_path, signal, subtype, fmt)
+    expected = sf.read(path, dtype="float32", always_2d=True)[0]
+    with AudioReader(path) as audio:
+        assert audio.memory_mapped is mapped
+        assert (audio.sr, audio.channels, audio.frames) == (SR, 3, len(signal))
+        np.testing.assert_allclose(audio.read(channel="all"), expected, atol=1e-7)
+        np.testing.assert_allclose(audio.read(channel=1), expected[:, 1], atol=1e-7)
+        np.testing.assert_allclose(audio.read(), expected.mean(axis=1), atol=1e-6)
+        assert audio.read().dtype == np.float32
+        assert audio.read(dtype="float64").dtype == np.float64
+
+
+@pytest.mark.parametrize("subtype", ("PCM_16", "PCM_24"))
+def test_bounds_are_clipped_to_the_file(tmp_path, signal, subtype):
+    path = write(tmp_path, signal[:, :2], subtype)
+    full = sf.read(path, dtype="float32", always_2d=True)[0].mean(axis=1)
+    with AudioReader(path) as audio:
+        n = audio.frames
+        np.testing.assert_allclose(audio.read(-5, 10), full[:10], atol=1e-6)
+        np.testing.assert_allclose(audio.read(n - 3, n + 100), full[-3:], atol=1e-6)
+        assert len(audio.read(10, 5)) == 0
+        assert len(audio.read(n + 10)) == 0
+        np.testing.assert_allclose(audio.read_time(0.1, 0.2), full[SR // 10:SR // 5], atol=1e-6)
+        np.testing.assert_allclose(np.concatenate(list(audio.blocks(1000))), full, atol=1e-6)
+        assert audio.duration == pytest.approx(len(signal) / SR)
+
+
+def test_native_samples_are_a_read_only_view(tmp_path, signal):
+    path = write(tmp_path, signal, "PCM_16")
+    with AudioReader(path) as audio:
+        native = audio.read(100, 200, channel="all", dtype=None)
+        assert native.dtype == np.dtype("<i2") and native.shape == (100, 3)
+        assert not native.flags.writeable
+        with pytest.raises(ValueError):
+            audio.read(dtype=None)  # a downmix is not expressible in int16
+        with pytest.raises(ValueError):
+            audio.read(dtype="int16")
+
+
+def test_streaming_writer_data_size_is_ignored(tmp_path, signal):
+    path = write(tmp_path, signal[:, 0], "PCM_16")
+    layout = parse_wav_layout(path)
+    with open(path, "r+b") as f:
+        f.seek(layout["offset"] - 4)
+        f.write(b"\x00\x00\x00\x00")  # data chunk size left at 0, as by a streaming writer
+    with AudioReader(path) as audio:
+        assert audio.memory_mapped and audio.frames == len(signal)
+
+
+def test_files_that_are_not_wav_are_not_mapped(tmp_path):
+    path = tmp_path / "text.wav"
+    path.write_bytes(b"not a wav file at all")
+    assert parse_wav_layout(str(path)) is None
+    with pytest.raises(sf.SoundFileError):
+        AudioReader(str(path))
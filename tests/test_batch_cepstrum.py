@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+import soundfile as sf
+
+from batch_cepstrum import analyze_packed, batch_extract_cpp_packed, pack_signals
+from cepstrum import analyze_signal, frame_layout, frame_signal, synthetic_vowel, to_analysis_rate
+
+SR = 44100
+
+
+@pytest.fixture(scope="module")
+def vowels():
+    """Vowels of different pitches and lengths, plus one shorter than an analysis window."""
+    rng = np.random.default_rng(1)
+    signals = [synthetic_vowel(SR, f0=rng.uniform(90, 250), duration=rng.uniform(0.3, 1.5), seed=i)
+               for i in range(12)]
+    return signals + [synthetic_vowel(SR, duration=0.05)]
+
+
+def test_packed_windows_are_each_signals_frames(vowels):
+    decimated = [to_analysis_rate(x, SR)[0] for x in vowels[:3]]
+    n_win, hop = frame_layout(10000)
+    windows, rows, offsets = pack_signals(decimated, n_win, hop)
+    assert not windows.flags.owndata  # a view of the concatenation, not a copy per frame
+    for i, x in enumerate(decimated):
+        np.testing.assert_array_equal(windows[rows[offsets[i]:offsets[i + 1]]], frame_signal(x, n_win, hop))
+
+
+@pytest.mark.parametrize("method", ("CPP", "CPPS"))
+def test_packed_values_match_per_file_analysis(vowels, method):
+    decimated = [to_analysis_rate(x, SR)[0] for x in vowels]
+    values = np.concatenate([analyze_packed(decimated[i:i + 5], 10000, method)[0]
+                             for i in range(0, len(decimated), 5)])
+    single = [float(analyze_signal(x, SR, method)["cpp"]) for x in vowels[:-1]]
+    np.testing.assert_allclose(values[:-1], single, atol=1e-6)
+    assert np.isnan(values[-1])
+
+
+def test_files_are_batched_by_rate_and_keep_their_order(tmp_path, vowels):
+    paths = []
+    for i, (x, sr) in enumerate([(vowels[0], SR), (vowels[1], SR), (vowels[-1], SR)]):
+        paths.append(str(tmp_path / f"{i}.wav"))
+        sf.write(paths[-1], x, sr, subtype="FLOAT")
+    paths.append(str(tmp_path / "8k.wav"))
+    sf.write(paths[-1], synthetic_vowel(8000, max_harmonic_freq=3900), 8000)
+    paths.append(str(tmp_path / "missing.wav"))
+
+    results, stats = batch_extract_cpp_packed(paths, "CPPS", max_batch_frames=100)
+    assert [r["filename"] for r in results] == ["0.wav", "1.wav", "2.wav", "8k.wav", "missing.wav"]
+    assert results[0]["cpp"] == pytest.approx(float(analyze_signal(vowels[0], SR)["cpp"]), abs=1e-6)
+    assert "shorter than one analysis window" in results[2]["error"]
+    assert "cpp" in results[3] and "error" in results[4]
+    assert stats["files"] == 5
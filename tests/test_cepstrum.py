@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from cepstrum import (analyze_signal, cepstral_peak_prominence, cepstrogram, cpp_settings, smooth_cepstra,
+                      synthetic_vowel, to_analysis_rate)
+
+METHODS = ("CPP", "CPPS")
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_values_do_not_depend_on_the_sampling_rate(method):
+    # The same sound rendered at each rate is decimated to 2 * MAX_FREQ before analysis
+    values = [float(analyze_signal(synthetic_vowel(sr), sr, method)["cpp"]) for sr in (16000, 44100, 48000)]
+    assert max(values) - min(values) <= 0.01
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_channels_are_analysed_independently(method):
+    x = np.stack([synthetic_vowel(44100, f0=120), synthetic_vowel(44100, f0=220, seed=1)])
+    both = analyze_signal(x, 44100, method)["cpp"]
+    single = [float(analyze_signal(channel, 44100, method)["cpp"]) for channel in x]
+    assert both == pytest.approx(single, abs=1e-6)
+
+
+@pytest.mark.parametrize("method", METHODS)
+def test_pre_emphasis_starts_at_min_f0(method):
+    # As the Praat script: To PowerCepstrogram: 60, 0.002, 5000, {min_f0}
+    samples, sr = to_analysis_rate(synthetic_vowel(44100), 44100)
+
+    def cpp(preemphasis_from):
+        _, quefrency, cepstra = cepstrogram(samples, sr, preemphasis_from=preemphasis_from)
+        cepstra = smooth_cepstra(quefrency, cepstra, method)
+        return cepstral_peak_prominence(quefrency, cepstra, 100, 330, cpp_settings(method)["trend_type"])[0].mean()
+
+    value = analyze_signal(samples, sr, method, min_f0=100, max_f0=330)["cpp"]
+    assert value == pytest.approx(cpp(100), abs=1e-9)
+    assert value != pytest.approx(cpp(50), abs=1e-3)
+
+
+def test_signal_shorter_than_one_window_is_rejected():
+    with pytest.raises(ValueError, match="shorter than one analysis window"):
+        analyze_signal(np.zeros(100, dtype=np.float32), 10000)
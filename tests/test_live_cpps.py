@@ -0,0 +1,69 @@
+import tracemalloc
+
+import numpy as np
+import pytest
+
+from cepstrum import analyze_signal, synthetic_vowel
+from live_cpps import IncrementalCPPS
+from resampling import StreamResampler, resample_to_rate
+
+SR = 44100
+
+
+def stream(analyzer, x, chunk_size):
+    times, values = [], []
+    for i in range(0, len(x), chunk_size):
+        t, v, _ = analyzer.push(x[i:i + chunk_size])
+        times.append(t.copy())
+        values.append(v.copy())
+    return np.concatenate(times), np.concatenate(values)
+
+
+@pytest.mark.parametrize("method", ("CPP", "CPPS"))
+@pytest.mark.parametrize("chunk_size", (7, 512, SR))
+def test_frames_match_batch_analysis(method, chunk_size):
+    x = synthetic_vowel(SR, duration=1.5)
+    batch = analyze_signal(x, SR, method)
+    analyzer = IncrementalCPPS(SR, method)
+    times, live = stream(analyzer, x, chunk_size)
+
+    # Live frame i + shift (trailing time smoothing) is batch frame i, at the same time
+    shift = analyzer.n_time_avg // 2
+    np.testing.assert_allclose(times[shift:], batch["times"][:len(times) - shift])
+    # Skip the first frames, whose trailing average is still filling up
+    n = min(len(live), len(batch["contour"])) - shift
+    np.testing.assert_allclose(live[2 * shift:shift + n], batch["contour"][shift:n], atol=1e-4)
+
+
+@pytest.mark.parametrize("sr", (8000, 16000, SR))
+@pytest.mark.parametrize("chunk_size", (1, 7, 882, 3 * SR))
+def test_stream_resampler_matches_whole_signal(sr, chunk_size):
+    x = synthetic_vowel(sr, duration=1.0, max_harmonic_freq=min(7500, sr // 2 - 100))
+    resampler = StreamResampler(sr, 10000, max_chunk=512)
+    out = []
+    for i in range(0, len(x), chunk_size):
+        out.append(resampler.push(x[i:i + chunk_size]).copy())
+        assert len(resampler.push(x[:0])) == 0
+    out = np.concatenate(out)
+    whole = resample_to_rate(x, sr, 10000)[0]
+    # Only the end differs: the stream is never flushed with zeros
+    tail = int(np.ceil(resampler.delay * resampler.rate)) + 1
+    np.testing.assert_allclose(out[:len(whole) - tail], whole[:len(whole) - tail], atol=1e-6)
+
+
+def test_push_does_not_allocate_in_the_resampler():
+    chunk = (0.1 * np.random.default_rng(0).standard_normal(SR // 50)).astype(np.float32)
+    resampler = StreamResampler(SR, 10000, max_chunk=len(chunk))
+    resampler.push(chunk)
+    tracemalloc.start()
+    resampler.push(chunk)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    assert peak < 16 * 1024  # Python objects only; one (outputs, taps) gather was ~750 KB
+
+
+def test_empty_chunks_complete_no_frames():
+    analyzer = IncrementalCPPS(SR)
+    times, values, smoothed = analyzer.push(np.zeros(0, dtype=np.float32))
+    assert len(times) == len(values) == len(smoothed) == 0
+    assert analyzer.smoothed is None
@@ -0,0 +1,26 @@
+import math
+
+import numpy as np
+import soundfile as sf
+
+from cepstrum import synthetic_vowel
+from resampling import decimation_report, resample_to_rate
+
+
+def test_signals_at_or_below_the_target_are_unchanged():
+    x = synthetic_vowel(16000)
+    y, sr = resample_to_rate(x, 16000, 22050)
+    assert y is x and sr == 16000
+
+
+def test_failing_rate_is_recorded_in_its_row(tmp_path):
+    path = tmp_path / "vowel.wav"
+    sf.write(path, synthetic_vowel(44100), 44100)
+    rows, summary = decimation_report([str(path)], rates=[16000, 0.5], engine="numpy")
+
+    good, bad = rows
+    assert "error" not in good and abs(good["deviation"]) < 1e-3
+    assert bad["target_rate"] == 0.5 and "ValueError" in bad["error"]
+    assert [(s["files"], s["errors"]) for s in summary] == [(1, 0), (0, 1)]
+    assert math.isnan(summary[1]["mean_abs_deviation"])
+    assert np.isfinite(summary[0]["mean_speedup"])
@@ -0,0 +1,149 @@
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from cepstrum import analyze_signal, synthetic_vowel
+from service import AnalysisService
+
+SR = 44100
+
+
+@pytest.fixture
+def wav(tmp_path):
+    path = tmp_path / "vowel.wav"
+    sf.write(path, synthetic_vowel(SR), SR, subtype="FLOAT")
+    return str(path)
+
+
+async def request(port, path, body=b"", method="POST", content_type="application/json", length=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    length = len(body) if length is None else length
+    writer.write((f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: {content_type}\r\n"
+                  f"Content-Length: {length}\r\n\r\n").encode() + body)
+    await writer.drain()
+    raw = await reader.read()
+    writer.close()
+    head, _, payload = raw.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(payload)
+
+
+def analyze(port, **options):
+    return request(port, "/analyze", json.dumps(options).encode())
+
+
+def run_service(scenario, **kwargs):
+    async def main():
+        service = AnalysisService(port=0, workers=1, engine="numpy", **kwargs)
+        await service.start()
+        try:
+            await scenario(service)
+        finally:
+            await service.stop()
+    asyncio.run(main())
+
+
+def test_path_and_upload_return_per_file_values(wav):
+    expected = {m: float(analyze_signal(sf.read(wav, dtype="float32")[0], SR, m)["cpp"]) for m in ("CPP", "CPPS")}
+
+    async def scenario(service):
+        with open(wav, "rb") as f:
+            data = f.read()
+        # Concurrent requests end up in one micro-batch and one packed pass
+        replies = await asyncio.gather(analyze(service.port, path=wav, method="CPP"),
+                                       analyze(service.port, path=wav, method="CPPS"),
+                                       request(service.port, "/analyze?method=CPPS", data, content_type="audio/wav"))
+        for (status, res), method in zip(replies, ("CPP", "CPPS", "CPPS")):
+            assert status == 200, res
+            assert res["cpp"] == pytest.approx(expected[method], abs=1e-6)
+            assert res["analysis_rate"] == 10000
+        assert [res["packed_jobs"] for _, res in replies] == [1, 2, 2]
+        status, health = await request(service.port, "/health", method="GET")
+        assert (status, health["status"]) == (200, "ok")
+
+    run_service(scenario, batch_wait=0.05)
+
+
+@pytest.mark.parametrize("options, message", [
+    ({"min_f0": 300, "max_f0": 200}, "min_f0 < max_f0"),
+    ({"min_f0": "nan"}, "min_f0 < max_f0"),
+    ({"analysis_rate": 0}, "analysis_rate"),
+    ({"method": "HNR"}, "method"),
+    ({"region": [1.0, 0.5]}, "region"),
+])
+def test_invalid_options_return_400(wav, options, message):
+    async def scenario(service):
+        status, res = await analyze(service.port, path=wav, **options)
+        assert status == 400
+        assert message in res["error"]
+
+    run_service(scenario)
+
+
+def test_invalid_requests_and_audio_return_400(wav, tmp_path):
+    short = tmp_path / "short.wav"
+    sf.write(short, np.zeros(SR // 20, dtype=np.float32), SR)
+
+    async def scenario(service):
+        assert (await request(service.port, "/analyze", b"{}"))[0] == 400  # no path
+        assert (await request(service.port, "/analyze", b"{}", length="-1"))[0] == 400
+        assert (await request(service.port, "/analyze", b"not audio", content_type="audio/wav"))[0] == 400
+        status, res = await analyze(service.port, path=str(tmp_path / "missing.wav"))
+        assert status == 400, res
+        status, res = await analyze(service.port, path=str(short))
+        assert status == 400 and "shorter than one analysis window" in res["error"]
+
+    run_service(scenario)
+
+
+def test_full_queue_returns_503_and_late_analysis_504(wav):
+    async def scenario(service):
+        # Hold the only worker slot: the batcher takes one job and waits, the next fills the queue
+        await service._slots.acquire()
+        service.timeout = 0.5
+        first = asyncio.create_task(analyze(service.port, path=wav))
+        await asyncio.sleep(0.1)
+        second = asyncio.create_task(analyze(service.port, path=wav))
+        await asyncio.sleep(0.1)
+        status, res = await analyze(service.port, path=wav)
+        assert status == 503, res
+        assert [(await first)[0], (await second)[0]] == [504, 504]
+
+        service._slots.release()
+        service.timeout = 30.0
+        status, res = await analyze(service.port, path=wav)
+        assert status == 200, res
+        metrics = (await request(service.port, "/metrics", method="GET"))[1]
+        assert (metrics["rejected"], metrics["timeouts"], metrics["completed"]) == (1, 2, 1)
+
+    run_service(scenario, queue_size=1)
+
+
+def test_dead_worker_is_replaced(wav):
+    async def kill_worker(service):
+        with pytest.raises(BrokenProcessPool):
+            await asyncio.get_running_loop().run_in_executor(service.pool, os._exit, 1)
+
+    async def scenario(service):
+        await kill_worker(service)
+        status, health = await request(service.port, "/health", method="GET")
+        assert (status, health["status"]) == (503, "broken")
+        for _ in range(100):
+            await asyncio.sleep(0.1)
+            status, health = await request(service.port, "/health", method="GET")
+            if status == 200:
+                break
+        assert health["status"] == "ok"
+
+        # Without a health check in between, the next request retries on a new pool
+        await kill_worker(service)
+        status, res = await analyze(service.port, path=wav)
+        assert status == 200, res
+        metrics = (await request(service.port, "/metrics", method="GET"))[1]
+        assert metrics["pool_restarts"] == 2
+
+    run_service(scenario)